@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Benchmark host-rule lookups against a large synthetic rule set.
+
+Times routing.match_rule() on a dict, as --resolve uses it, and the
+launch path that runs on every click: routing.match_rule() probing the
+SQLite RememberedStore.
+
+Usage: python3 benchmarks/bench_rules.py [--rules N] [--lookups N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'source', 'python'))
+
+import routing  # noqa: E402
+from run import make_rules  # noqa: E402
+from store import RememberedStore  # noqa: E402
+
+
+def make_hosts(mapping, count, rng):
+    keys = list(mapping)
+    hosts = []
+    for _ in range(count):
+        base = rng.choice(keys).lstrip('*.')
+        kind = rng.randrange(4)
+        if kind == 0:
+            hosts.append(base)
+        elif kind == 1:
+            hosts.append(f"www.{base}")
+        elif kind == 2:
+            hosts.append(f"a.b.c.{base}")
+        else:
+            hosts.append(f"miss{rng.randrange(10**6)}.example")
+    return hosts
+
+
+def per_call(func, hosts):
+    start = time.perf_counter()
+    for host in hosts:
+        func(host)
+    return (time.perf_counter() - start) / len(hosts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rules', type=int, default=100_000)
+    parser.add_argument('--lookups', type=int, default=200_000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    mapping = make_rules(args.rules, rng)
+    hosts = make_hosts(mapping, args.lookups, rng)
+
+    with tempfile.TemporaryDirectory(prefix='bs-bench-') as root:
+        store = RememberedStore(os.path.join(root, 'remembered.db'))
+        try:
+            start = time.perf_counter()
+            store.replace_all(mapping)
+            load_s = time.perf_counter() - start
+
+            dict_us = per_call(lambda h: routing.match_rule(h, mapping), hosts) * 1e6
+            store_us = per_call(lambda h: routing.match_rule(h, store), hosts) * 1e6
+        finally:
+            store.close()
+
+    print(f"rules:               {len(mapping)}")
+    print(f"store load:          {load_s * 1e3:.1f} ms")
+    print(f"match_rule:          {dict_us:.2f} us/lookup (dict, --resolve)")
+    print(f"match_rule:          {store_us:.2f} us/lookup (RememberedStore, launch path)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""Headless benchmark suite for browser discovery, config loading and routing.
+
+Generates synthetic application trees (plain, Flatpak-style and AppImage
+layouts) and rule sets in a temporary directory, times the hot paths and
+writes machine-readable JSON. With --baseline, the fastest batch of each
+benchmark (less noisy than the median) is compared to a saved run, and
+the exit status is 1 if any benchmark got slower than the threshold
+allows.
+
+Usage:
+    python3 benchmarks/run.py --output results.json
+    python3 benchmarks/run.py --baseline results.json --threshold 0.2
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'source', 'python')
+sys.path.insert(0, SOURCE_DIR)
+
+import browser_scan  # noqa: E402
+import config  # noqa: E402
+import launcher  # noqa: E402
+import metrics  # noqa: E402
+import routing  # noqa: E402
+import site_index  # noqa: E402
+
+BROWSER_RATIO = 0.05
+
+# Linux rejects longer single environment strings (MAX_ARG_STRLEN)
+MAX_ENV_VALUE = 128 * 1024 - len('XDG_DATA_DIRS=')
+
+# Runs in a fresh process: GIO reads XDG_DATA_* once and keeps its
+# AppInfo index for the lifetime of the process.
+GIO_PROBE = """
+import json, sys, time
+sys.path.insert(0, sys.argv[1])
+import browser_scan
+start = time.perf_counter()
+browsers = browser_scan.gio_browsers()
+cold = (time.perf_counter() - start) * 1000
+warm = []
+for _ in range(5):
+    start = time.perf_counter()
+    browser_scan.gio_browsers()
+    warm.append((time.perf_counter() - start) * 1000)
+print(json.dumps({"cold_ms": cold, "warm_ms": min(warm),
+                  "browsers": None if browsers is None else len(browsers)}))
+"""
+
+# The first spawn in a fresh process, as on a click on a remembered site:
+# includes importing whatever the spawn method needs (subprocess for Popen)
+SPAWN_PROBE = """
+import json, sys, time
+sys.path.insert(0, sys.argv[1])
+import launcher
+start = time.perf_counter()
+launcher.spawn([sys.argv[3]], method=sys.argv[2])
+print(json.dumps({"first_ms": (time.perf_counter() - start) * 1000}))
+"""
+
+
+def _desktop_file(path, name, browser, icon='web-browser'):
+    categories = 'Network;WebBrowser;' if browser else 'Utility;TextEditor;'
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(
+            "[Desktop Entry]\n"
+            "Type=Application\n"
+            f"Name={name}\n"
+            f"Name[de]={name} (de)\n"
+            "Comment=Synthetic entry\n"
+            f"Exec=/usr/bin/{name.lower().replace(' ', '-')} %u\n"
+            f"Icon={icon}\n"
+            f"Categories={categories}\n"
+            "MimeType=text/html;x-scheme-handler/http;x-scheme-handler/https;\n"
+            "\n[Desktop Action new-window]\nName=New Window\nExec=true\n"
+        )
+
+
+def make_tree(root, count, rng):
+    """Create count .desktop files spread over user, system, Flatpak and AppImage dirs.
+
+    Returns the list of application directories in priority order.
+    """
+    user_dir = os.path.join(root, 'home', '.local', 'share', 'applications')
+    system_dir = os.path.join(root, 'usr', 'share', 'applications')
+    flatpak_root = os.path.join(root, 'flatpak', 'app')
+    appimage_dir = os.path.join(root, 'home', 'Applications', 'appimage-apps', 'share', 'applications')
+    for d in (user_dir, system_dir, appimage_dir):
+        os.makedirs(d, exist_ok=True)
+
+    for i in range(count):
+        browser = rng.random() < BROWSER_RATIO
+        name = f"App {i}" if not browser else f"Browser {i}"
+        kind = i % 4
+        if kind == 0:
+            target = user_dir
+        elif kind == 1:
+            target = system_dir
+        elif kind == 2:
+            app_id = f"org.example.App{i}"
+            deploy = os.path.join(flatpak_root, app_id, 'x86_64', 'stable', f"{i:040x}")
+            export = os.path.join(deploy, 'export', 'share', 'applications')
+            os.makedirs(export, exist_ok=True)
+            # An older, inactive deploy that a deep glob would also visit
+            os.makedirs(os.path.join(flatpak_root, app_id, 'x86_64', 'stable', 'old', 'export',
+                                     'share', 'applications'), exist_ok=True)
+            os.symlink(f"{i:040x}", os.path.join(flatpak_root, app_id, 'x86_64', 'stable', 'active'))
+            os.symlink(os.path.join('x86_64', 'stable'), os.path.join(flatpak_root, app_id, 'current'))
+            _desktop_file(os.path.join(export, f"{app_id}.desktop"), name, browser)
+            continue
+        else:
+            target = appimage_dir
+            icon_dir = os.path.join(appimage_dir, '..', 'icons')
+            os.makedirs(icon_dir, exist_ok=True)
+            icon_rel = f"icons/app{i}.png"
+            with open(os.path.join(appimage_dir, '..', icon_rel), 'wb') as f:
+                f.write(b'\x89PNG\r\n\x1a\n')
+            _desktop_file(os.path.join(target, f"app{i}.desktop"), name, browser, icon=icon_rel)
+            continue
+        _desktop_file(os.path.join(target, f"app{i}.desktop"), name, browser)
+
+    return [user_dir, appimage_dir, system_dir, flatpak_root], flatpak_root
+
+
+def make_rules(count, rng):
+    """count random rule keys of all three forms -> browser name."""
+    mapping = {}
+    tlds = ['com', 'org', 'net', 'de', 'io']
+    while len(mapping) < count:
+        prefix = rng.choice(['', '', '*.', '.'])
+        mapping[f"{prefix}site{rng.randrange(count * 4)}.{rng.choice(tlds)}"] = f"Browser {rng.randrange(8)}"
+    return mapping
+
+
+def measure(func, repeat, min_time=0.2):
+    """Return per-call timings in ms over repeated batches."""
+    func()  # warm-up
+    start = time.perf_counter()
+    func()
+    once = time.perf_counter() - start
+    number = max(1, int(min_time / repeat / max(once, 1e-9)))
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number * 1000)
+    return {
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "calls": number * repeat,
+    }
+
+
+class Sandbox:
+    """Points browser_scan and config at a temporary tree."""
+
+    def __init__(self, root, app_dirs, flatpak_root):
+        self.root = root
+        self._saved = {}
+        self._set(browser_scan, 'CACHE_DIR', os.path.join(root, 'cache'))
+        self._set(browser_scan, 'CACHE_FILE', os.path.join(root, 'cache', 'browsers.json'))
+        self._set(browser_scan, 'FLATPAK_APP_ROOT', flatpak_root)
+        self._set(browser_scan, '_application_locations', lambda: list(app_dirs))
+        config_dir = os.path.join(root, 'config')
+        self._set(config, 'CONFIG_DIR', config_dir)
+        self._set(config, 'CONFIG_FILE', os.path.join(config_dir, 'config.json'))
+        self._set(config, 'REMEMBERED_FILE', os.path.join(config_dir, 'remembered.json'))
+        self._set(config, 'REMEMBERED_DB', os.path.join(config_dir, 'remembered.db'))
+        self._set(config, '_store', None)
+        self._set(config, 'POLICY_CACHE', os.path.join(root, 'cache', 'policy.json'))
+        self._set(config, '_policy', None)
+        # Neither the real system policy nor the user's usage counters
+        self._saved_config_dirs = os.environ.get('XDG_CONFIG_DIRS')
+        os.environ['XDG_CONFIG_DIRS'] = os.path.join(root, 'xdg')
+        self._set(metrics, 'enabled', False)
+        self._set(metrics, 'METRICS_FILE', os.path.join(root, 'cache', 'metrics.json'))
+        os.makedirs(config_dir, exist_ok=True)
+
+    def _set(self, module, name, value):
+        self._saved.setdefault((module, name), getattr(module, name))
+        setattr(module, name, value)
+
+    def restore(self):
+        if config._store is not None:
+            config._store.close()
+        for (module, name), value in self._saved.items():
+            setattr(module, name, value)
+        if self._saved_config_dirs is None:
+            os.environ.pop('XDG_CONFIG_DIRS', None)
+        else:
+            os.environ['XDG_CONFIG_DIRS'] = self._saved_config_dirs
+
+
+def bench_discovery(size, repeat, rng, results):
+    root = tempfile.mkdtemp(prefix='bs-bench-')
+    try:
+        app_dirs, flatpak_root = make_tree(root, size, rng)
+        sandbox = Sandbox(root, app_dirs, flatpak_root)
+        try:
+            results[f"scan_browser_desktop_files/{size}"] = measure(
+                lambda: browser_scan.scan_browser_desktop_files(use_cache=False), repeat)
+            files = [os.path.join(d, name) for d in browser_scan.application_dirs()
+                     for name in sorted(os.listdir(d)) if name.endswith('.desktop')]
+            for workers in (1, 4):
+                results[f"parse_files/{size}/workers={workers}"] = measure(
+                    lambda: browser_scan._parse_files(files, workers), repeat)
+            results[f"get_browsers_cold/{size}"] = measure(
+                lambda: browser_scan.get_browsers(use_cache=False), repeat)
+            browser_scan.get_browsers()
+            results[f"get_browsers_cached/{size}"] = measure(browser_scan.get_browsers, repeat)
+            results[f"get_browsers_cached/{size}"]["browsers"] = len(browser_scan.get_browsers())
+            bench_gio(root, app_dirs, flatpak_root, size, repeat, results)
+        finally:
+            sandbox.restore()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def bench_gio(root, app_dirs, flatpak_root, size, repeat, results):
+    """Time the GIO AppInfo backend on the same tree, one process per sample."""
+    data_dirs = [os.path.dirname(d) for d in app_dirs[1:] if d != flatpak_root]
+    data_dirs += [os.path.dirname(d) for d in browser_scan._flatpak_app_dirs(flatpak_root)]
+    if len(':'.join(data_dirs)) >= MAX_ENV_VALUE:
+        print(f"XDG_DATA_DIRS for {size} apps is too long for exec(); skipping gio_browsers",
+              file=sys.stderr)
+        return
+    env = dict(os.environ,
+               HOME=os.path.join(root, 'home'),
+               XDG_DATA_HOME=os.path.dirname(app_dirs[0]),
+               XDG_DATA_DIRS=':'.join(data_dirs))
+    samples = []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, '-c', GIO_PROBE, SOURCE_DIR],
+                              env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"gio probe failed: {proc.stderr.strip()}", file=sys.stderr)
+            return
+        sample = json.loads(proc.stdout)
+        if sample["browsers"] is None:
+            print("GIO (PyGObject) not available; skipping gio_browsers", file=sys.stderr)
+            return
+        samples.append(sample)
+    for kind in ('cold', 'warm'):
+        values = [sample[f"{kind}_ms"] for sample in samples]
+        results[f"gio_browsers_{kind}/{size}"] = {
+            "median_ms": statistics.median(values),
+            "min_ms": min(values),
+            "calls": len(values),
+            "browsers": samples[0]["browsers"],
+        }
+
+
+def bench_config(size, repeat, rng, results):
+    root = tempfile.mkdtemp(prefix='bs-bench-')
+    try:
+        sandbox = Sandbox(root, [], os.path.join(root, 'none'))
+        try:
+            config.save_config({"appearance": {"icon_size": 64}, "default_browser": "Browser 1"})
+            mapping = make_rules(size, rng)
+            config.save_remembered(mapping)
+            results[f"load_config/{size}"] = measure(config.load_config, repeat)
+            results[f"load_remembered/{size}"] = measure(config.load_remembered, repeat)
+
+            keys = list(mapping)
+            urls = [f"https://www.{rng.choice(keys).lstrip('*.')}/path?q=1" for _ in range(200)]
+            store = config.remembered_store()
+            results[f"remembered_lookup/{size}"] = measure(
+                lambda: [routing.remembered_browser_name(u, store) for u in urls], repeat)
+            results[f"remembered_lookup/{size}"]["per_url_ms"] = (
+                results[f"remembered_lookup/{size}"]["median_ms"] / len(urls))
+
+            # --resolve throughput over a history-like stream with repeated hosts
+            history = [f"{rng.choice(urls)}&n={i}" for i in range(10000)]
+            results[f"resolve_urls/{size}"] = measure(
+                lambda: sum(1 for _ in routing.resolve_urls(history, [], mapping)), repeat)
+            results[f"resolve_urls/{size}"]["per_url_ms"] = (
+                results[f"resolve_urls/{size}"]["median_ms"] / len(history))
+
+            # Settings search: one keystroke should filter within a frame (~16 ms)
+            index = site_index.SiteIndex(mapping)
+            results[f"site_search_substring/{size}"] = measure(lambda: index.search('site1'), repeat)
+            results[f"site_search_suffix/{size}"] = measure(lambda: index.search('.com'), repeat)
+            results[f"site_search_browser/{size}"] = measure(lambda: index.search('browser 3'), repeat)
+        finally:
+            sandbox.restore()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def bench_launch(repeat, results):
+    """Latency of starting a detached process (the click-to-exec cost).
+
+    spawn/* is a warm spawn in a long-lived process (--daemon);
+    spawn_first/* the first one in a fresh process, one process per sample.
+    """
+    true_path = shutil.which('true') or '/bin/true'
+    for method in ('posix_spawn', 'popen'):
+        results[f"spawn/{method}"] = measure(
+            lambda: launcher.spawn([true_path], method=method), repeat, min_time=0.5)
+        samples = []
+        for _ in range(max(repeat, 10)):
+            proc = subprocess.run([sys.executable, '-c', SPAWN_PROBE, SOURCE_DIR, method, true_path],
+                                  capture_output=True, text=True, check=True)
+            samples.append(json.loads(proc.stdout)["first_ms"])
+        results[f"spawn_first/{method}"] = {
+            "median_ms": statistics.median(samples),
+            "min_ms": min(samples),
+            "calls": len(samples),
+        }
+
+
+def compare(results, baseline, threshold):
+    """Return a list of (name, old_ms, new_ms) regressions beyond threshold."""
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            continue
+        if result["min_ms"] > old["min_ms"] * (1 + threshold):
+            regressions.append((name, old["min_ms"], result["min_ms"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BrowserSelector benchmark suite")
+    parser.add_argument('--sizes', default='10,1000,10000',
+                        help="comma-separated .desktop file counts (default: %(default)s)")
+    parser.add_argument('--rule-sizes', default='1000,100000',
+                        help="comma-separated remembered rule counts (default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=5, help="timed batches per benchmark")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--groups', default='discovery,config,launch',
+                        help="benchmark groups to run (default: %(default)s)")
+    parser.add_argument('--output', help="write JSON results to this file (default: stdout)")
+    parser.add_argument('--baseline', help="compare against a saved JSON result file")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="allowed slowdown vs. baseline as a fraction (default: %(default)s)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = {}
+    groups = set(args.groups.split(','))
+    if 'discovery' in groups:
+        for size in (int(s) for s in args.sizes.split(',') if s):
+            bench_discovery(size, args.repeat, rng, results)
+    if 'config' in groups:
+        for size in (int(s) for s in args.rule_sizes.split(',') if s):
+            bench_config(size, args.repeat, rng, results)
+    if 'launch' in groups:
+        bench_launch(args.repeat, results)
+
+    report = {
+        "meta": {
+            "time": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, old, new in regressions:
+            print(f"REGRESSION {name}: {old:.3f} ms -> {new:.3f} ms "
+                  f"(+{(new / old - 1) * 100:.0f}%)", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions above {args.threshold:.0%} vs. {args.baseline}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
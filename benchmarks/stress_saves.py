@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Stress test for concurrent config and remembered-site writes.
+
+Starts many writer processes that, like parallel choosers and settings
+windows, remember sites one by one, save settings-style diffs and do
+read-modify-write cycles on config.json, while reader processes keep
+loading both. Afterwards it checks that no update was lost and that no
+reader ever saw a half-written file. Exits with status 1 on failure.
+
+Usage:
+    python3 benchmarks/stress_saves.py --writers 16 --iterations 50 --readers 4
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'source', 'python'))
+
+import config  # noqa: E402
+
+
+def use_sandbox(root):
+    """Point config at a temporary tree (inherited by forked workers)."""
+    os.environ['XDG_CONFIG_DIRS'] = os.path.join(root, 'no-system-config')
+    config.CONFIG_DIR = os.path.join(root, 'config')
+    config.CONFIG_FILE = os.path.join(config.CONFIG_DIR, 'config.json')
+    config.REMEMBERED_FILE = os.path.join(config.CONFIG_DIR, 'remembered.json')
+    config.REMEMBERED_DB = os.path.join(config.CONFIG_DIR, 'remembered.db')
+    config.POLICY_CACHE = os.path.join(root, 'cache', 'policy.json')
+    config._store = None
+    config._policy = None
+
+
+def _increment(data):
+    data["stress_counter"] = data.get("stress_counter", 0) + 1
+
+
+def writer(index, iterations):
+    for n in range(iterations):
+        # A chooser remembering one site
+        config.set_remembered(f"w{index}-{n}.example", f"Browser {index}")
+        # Its write-behind variant
+        config.remember_later(f"q{index}-{n}.example", f"Browser {index}")
+        # A settings window saving its diff: one rule added, the previous one removed
+        previous = [f"s{index}-{n - 1}.example"] if n else []
+        config.update_remembered({f"s{index}-{n}.example": f"Browser {index}"}, previous)
+        # Settings changes, as read-modify-write cycles on config.json
+        config.modify_config(_increment)
+        config.update_config({"appearance": {"icon_size": 32 + index % 8}})
+    config.flush_remembered()
+
+
+def reader(stop, errors):
+    torn = 0
+    while not stop.is_set():
+        try:
+            with open(config.CONFIG_FILE, encoding='utf-8') as f:
+                json.load(f)
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            torn += 1
+        config._policy = None
+        config.load_config()
+        try:
+            config.remembered_store().items()
+        except sqlite3.Error:
+            torn += 1
+    with errors.get_lock():
+        errors.value += torn
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent save stress test")
+    parser.add_argument('--writers', type=int, default=16)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--readers', type=int, default=4)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bs-stress-')
+    try:
+        use_sandbox(root)
+        ctx = multiprocessing.get_context('fork')
+        stop = ctx.Event()
+        errors = ctx.Value('i', 0)
+        readers = [ctx.Process(target=reader, args=(stop, errors)) for _ in range(args.readers)]
+        writers = [ctx.Process(target=writer, args=(i, args.iterations)) for i in range(args.writers)]
+        start = time.perf_counter()
+        for proc in readers + writers:
+            proc.start()
+        for proc in writers:
+            proc.join()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        for proc in readers:
+            proc.join()
+
+        failures = []
+        if any(proc.exitcode for proc in writers + readers):
+            failures.append("a worker process failed")
+        counter = config._read_json(config.CONFIG_FILE).get("stress_counter")
+        expected_counter = args.writers * args.iterations
+        if counter != expected_counter:
+            failures.append(f"config.json counter is {counter}, expected {expected_counter}")
+        remembered = config.load_remembered()
+        for i in range(args.writers):
+            for n in range(args.iterations):
+                for prefix in ('w', 'q'):
+                    if remembered.get(f"{prefix}{i}-{n}.example") != f"Browser {i}":
+                        failures.append(f"lost remembered update {prefix}{i}-{n}.example")
+            last = args.iterations - 1
+            kept = [d for d in remembered if d.startswith(f"s{i}-")]
+            if kept != [f"s{i}-{last}.example"]:
+                failures.append(f"settings diffs of writer {i} left {sorted(kept)}")
+        if errors.value:
+            failures.append(f"readers saw {errors.value} torn or failed reads")
+
+        writes = args.writers * args.iterations * 5
+        print(json.dumps({
+            "writers": args.writers,
+            "readers": args.readers,
+            "iterations": args.iterations,
+            "seconds": round(elapsed, 3),
+            "writes_per_second": round(writes / elapsed),
+            "failures": len(failures),
+        }))
+        for failure in failures[:20]:
+            print(failure, file=sys.stderr)
+        return 1 if failures else 0
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
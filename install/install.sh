@@ -9,7 +9,6 @@ SOURCE_DIR="$SCRIPT_DIR/../source"
 # Check dependencies
 missing=()
 python3 -c "import gi; gi.require_version('Gtk', '4.0'); from gi.repository import Gtk" 2>/dev/null || missing+=("python-gobject + gtk4")
-python3 -c "from xdg.DesktopEntry import DesktopEntry" 2>/dev/null || missing+=("python-xdg")
 
 if [ ${#missing[@]} -gt 0 ]; then
     echo "Missing dependencies:"
@@ -17,8 +16,8 @@ if [ ${#missing[@]} -gt 0 ]; then
         echo "  - $dep"
     done
     echo ""
-    echo "Install with: sudo pacman -S python-gobject gtk4 python-xdg"
-    echo "Or on Debian/Ubuntu: sudo apt install python3-gi gir1.2-gtk-4.0 python3-xdg"
+    echo "Install with: sudo pacman -S python-gobject gtk4"
+    echo "Or on Debian/Ubuntu: sudo apt install python3-gi gir1.2-gtk-4.0"
     exit 1
 fi
 
@@ -27,7 +26,19 @@ mkdir -p "$INSTALL_DIR"
 cp "$SOURCE_DIR/python/main.py" "$INSTALL_DIR/main.py"
 cp "$SOURCE_DIR/python/config.py" "$INSTALL_DIR/config.py"
 cp "$SOURCE_DIR/python/settings.py" "$INSTALL_DIR/settings.py"
+cp "$SOURCE_DIR/python/store.py" "$INSTALL_DIR/store.py"
+cp "$SOURCE_DIR/python/timings.py" "$INSTALL_DIR/timings.py"
+cp "$SOURCE_DIR/python/watcher.py" "$INSTALL_DIR/watcher.py"
 cp "$SOURCE_DIR/python/browser_scan.py" "$INSTALL_DIR/browser_scan.py"
+cp "$SOURCE_DIR/python/icon_cache.py" "$INSTALL_DIR/icon_cache.py"
+cp "$SOURCE_DIR/python/launcher.py" "$INSTALL_DIR/launcher.py"
+cp "$SOURCE_DIR/python/metrics.py" "$INSTALL_DIR/metrics.py"
+cp "$SOURCE_DIR/python/remote.py" "$INSTALL_DIR/remote.py"
+cp "$SOURCE_DIR/python/routing.py" "$INSTALL_DIR/routing.py"
+cp "$SOURCE_DIR/python/rules.py" "$INSTALL_DIR/rules.py"
+cp "$SOURCE_DIR/python/rules_io.py" "$INSTALL_DIR/rules_io.py"
+cp "$SOURCE_DIR/python/selector.py" "$INSTALL_DIR/selector.py"
+cp "$SOURCE_DIR/python/site_index.py" "$INSTALL_DIR/site_index.py"
 cp "$SOURCE_DIR/browserselector" "$INSTALL_DIR/browserselector"
 chmod +x "$INSTALL_DIR/browserselector"
 
@@ -1,9 +1,35 @@
 """Browser discovery from .desktop files."""
 
+import json
 import os
 import re
+import shutil
+import zlib
+
+import config
+import metrics
+import timings
 
 SELF_NAMES = {'browserselector', 'browser-selector', 'browser selector'}
+BROWSER_CATEGORIES = {'web-browser', 'browser', 'internet', 'web browser', 'webbrowser'}
+_ENTRY_KEYS = {'Name', 'Exec', 'Icon', 'Categories', 'Hidden', 'NoDisplay', 'TryExec'}
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'browserselector')
+CACHE_FILE = os.path.join(CACHE_DIR, 'browsers.json')
+CACHE_VERSION = 7
+
+FLATPAK_APP_ROOT = '/var/lib/flatpak/app'
+# Parsing is pure Python and holds the GIL, so extra threads only help
+# where reading the files dominates (e.g. a cold network home directory);
+# on a local disk one thread was twice as fast as eight for 4000 files
+SCAN_WORKERS = int(os.environ.get('BROWSERSELECTOR_SCAN_WORKERS', '1'))
+MIN_FILES_PER_WORKER = 64
+
+# 'scan' parses .desktop files (cached per directory); 'gio' asks GIO's
+# AppInfo registry for URL/HTML handlers and falls back to the scan.
+DISCOVERY_BACKEND = os.environ.get('BROWSERSELECTOR_DISCOVERY', 'scan')
+BROWSER_MIME_TYPES = ('x-scheme-handler/https', 'x-scheme-handler/http',
+                      'text/html', 'application/xhtml+xml')
 
 
 def clean_exec_command(exec_str):
@@ -11,14 +37,114 @@ def clean_exec_command(exec_str):
     return re.sub(r'%[uUfFdDnNickvm]', '', exec_str).strip()
 
 
-def parse_desktop_entry(file_path):
-    """Parse a .desktop file and extract browser info."""
-    from xdg.DesktopEntry import DesktopEntry
-    entry = DesktopEntry()
-    entry.parse(file_path)
+_STRING_ESCAPES = {'s': ' ', 'n': '\n', 't': '\t', 'r': '\r', '\\': '\\'}
+_QUOTED_ESCAPES = '"`$\\'
 
-    icon = entry.getIcon()
 
+def _unescape_string(value):
+    out = []
+    i = 0
+    while i < len(value):
+        c = value[i]
+        if c == '\\' and i + 1 < len(value) and value[i + 1] in _STRING_ESCAPES:
+            out.append(_STRING_ESCAPES[value[i + 1]])
+            i += 2
+            continue
+        out.append(c)
+        i += 1
+    return ''.join(out)
+
+
+def parse_exec(exec_str):
+    """Split an Exec= value into an argv template following the Desktop Entry spec.
+
+    Handles the string escapes (\\s, \\n, ...) and double-quoted
+    arguments with their backslash escapes. Field codes such as %u or %U
+    are kept in place; launcher.expand_exec() fills them in. Returns
+    (argv, quoted), quoted being the indexes of the arguments that were
+    (partly) double-quoted: the spec does not allow field codes there,
+    so the launcher shell-quotes what it substitutes into them, like GLib.
+    """
+    value = _unescape_string(exec_str)
+    args = []
+    quoted = []
+    current = []
+    in_token = False
+    in_quotes = False
+    i = 0
+    while i < len(value):
+        c = value[i]
+        if in_quotes:
+            if c == '\\' and i + 1 < len(value) and value[i + 1] in _QUOTED_ESCAPES:
+                current.append(value[i + 1])
+                i += 2
+                continue
+            if c == '"':
+                in_quotes = False
+            else:
+                current.append(c)
+        elif c in ' \t\n':
+            if in_token:
+                args.append(''.join(current))
+                current = []
+                in_token = False
+        elif c == '"':
+            if not quoted or quoted[-1] != len(args):
+                quoted.append(len(args))
+            in_quotes = in_token = True
+        else:
+            current.append(c)
+            in_token = True
+        i += 1
+    if in_token:
+        args.append(''.join(current))
+    return args, quoted
+
+
+def _locale_candidates():
+    """Locale names to try for localized keys, most specific first.
+
+    Follows the Desktop Entry spec: lang_COUNTRY@MODIFIER, lang_COUNTRY,
+    lang@MODIFIER, lang.
+    """
+    value = ''
+    for var in ('LANGUAGE', 'LC_ALL', 'LC_MESSAGES', 'LANG'):
+        value = os.environ.get(var, '')
+        if value:
+            break
+    langs = []
+    for loc in value.split(':'):
+        loc = loc.strip()
+        if not loc or loc in ('C', 'POSIX'):
+            continue
+        lang, _, modifier = loc.partition('@')
+        base, _, country = lang.split('.', 1)[0].partition('_')
+        variants = []
+        if country and modifier:
+            variants.append(f"{base}_{country}@{modifier}")
+        if country:
+            variants.append(f"{base}_{country}")
+        if modifier:
+            variants.append(f"{base}@{modifier}")
+        variants.append(base)
+        for variant in variants:
+            if variant not in langs:
+                langs.append(variant)
+    return langs
+
+
+def _is_true(value):
+    return value is not None and value.strip().lower() == 'true'
+
+
+def _try_exec_ok(value):
+    """Check a TryExec= value: an absolute executable path or a program on PATH."""
+    if os.path.isabs(value):
+        return os.access(value, os.X_OK)
+    return shutil.which(value) is not None
+
+
+def _resolve_icon(icon, file_path):
     # Handle AppImage custom icon paths
     if icon and '/' in icon and 'appimage' in file_path.lower():
         if not os.path.exists(icon):
@@ -26,77 +152,356 @@ def parse_desktop_entry(file_path):
             for rel in ['', '..', '../..', 'icons', '../icons']:
                 candidate = os.path.join(app_dir, rel, icon)
                 if os.path.exists(candidate):
-                    icon = candidate
+                    return candidate
+            return "web-browser"
+    return icon or "web-browser"
+
+
+def read_desktop_entry(file_path, browsers_only=False, langs=None):
+    """Parse the [Desktop Entry] group of a .desktop file in one pass.
+
+    Returns (name, info) where info is the browser record (None when the
+    entry has no usable Exec), or None when the file is not a candidate.
+    With browsers_only, files are rejected as soon as their Categories
+    rule them out, and Hidden, NoDisplay and failing TryExec entries are
+    skipped as well.
+    """
+    if langs is None:
+        langs = _locale_candidates()
+    values = {}
+    localized = {}
+    in_group = False
+    with open(file_path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line[0] == '#':
+                continue
+            if line[0] == '[':
+                if in_group:
                     break
-            else:
-                icon = "web-browser"
+                in_group = line == '[Desktop Entry]'
+                continue
+            if not in_group:
+                continue
+            key, sep, value = line.partition('=')
+            if not sep:
+                continue
+            key = key.strip()
+            value = value.strip()
+            if key.startswith('Name[') and key.endswith(']'):
+                localized[key[5:-1]] = value
+            elif key in _ENTRY_KEYS:
+                if browsers_only and key == 'Categories':
+                    categories = {cat.strip().lower() for cat in value.split(';')}
+                    if not categories & BROWSER_CATEGORIES:
+                        return None
+                values[key] = value
+
+    name = values.get('Name', '')
+    for lang in langs:
+        if lang in localized:
+            name = localized[lang]
+            break
+
+    if browsers_only:
+        if name and name.lower() in SELF_NAMES:
+            return None
+        if not values.get('Categories'):
+            return None
+        if _is_true(values.get('Hidden')) or _is_true(values.get('NoDisplay')):
+            return None
+        try_exec = values.get('TryExec')
+        if try_exec and not _try_exec_ok(try_exec):
+            return None
 
-    exec_cmd = clean_exec_command(entry.getExec())
+    exec_cmd = clean_exec_command(values.get('Exec', ''))
     if not exec_cmd:
-        return None
+        return name, None
 
-    return {
-        "name": entry.getName(),
+    argv, quoted = parse_exec(values['Exec'])
+    return name, {
+        "name": name,
         "exec_command": exec_cmd,
-        "icon": icon or "web-browser",
+        "exec": values['Exec'],
+        "argv": argv,
+        "argv_quoted": quoted,
+        "icon": _resolve_icon(values.get('Icon', ''), file_path),
+        "icon_key": values.get('Icon', ''),
+        "desktop_file": file_path,
     }
 
 
-def scan_browser_desktop_files():
-    """Find all browser .desktop files on the system."""
-    import glob as globmod
-    from xdg.DesktopEntry import DesktopEntry
+def parse_desktop_entry(file_path):
+    """Parse a .desktop file and extract browser info."""
+    return read_desktop_entry(file_path)[1]
 
-    browser_files = {}
+
+def _application_locations():
+    """Application directories, lowest priority first.
+
+    FLATPAK_APP_ROOT stands for the export directories of all system
+    Flatpak apps, expanded by _flatpak_app_dirs().
+    """
     home = os.path.expanduser('~')
-    locations = [
-        os.path.join(home, '.local/share/applications/*.desktop'),
-        os.path.join(home, '.local/share/flatpak/exports/share/applications/*.desktop'),
-        '/usr/share/applications/*.desktop',
-        '/usr/local/share/applications/*.desktop',
-        '/var/lib/flatpak/app/*/*/*/*/export/share/applications/*.desktop',
-        '/var/lib/flatpak/exports/share/applications/*.desktop',
+    return [
+        os.path.join(home, '.local/share/applications'),
+        os.path.join(home, '.local/share/flatpak/exports/share/applications'),
+        '/usr/share/applications',
+        '/usr/local/share/applications',
+        FLATPAK_APP_ROOT,
+        '/var/lib/flatpak/exports/share/applications',
     ]
 
-    browser_categories = {'web-browser', 'browser', 'internet', 'web browser', 'webbrowser'}
 
-    for location in locations:
-        base_dir = os.path.dirname(location.split('*')[0])
-        if not os.path.isdir(base_dir) or not os.access(base_dir, os.R_OK):
-            continue
+def _flatpak_app_dirs(root):
+    """Export dirs of the deployed version of each Flatpak app.
+
+    Follows only the app/<id>/current/active symlinks instead of globbing
+    every arch, branch and commit below root.
+    """
+    try:
+        app_ids = sorted(os.listdir(root))
+    except OSError:
+        return []
+    return [os.path.join(root, app_id, 'current', 'active', 'export', 'share', 'applications')
+            for app_id in app_ids]
+
+
+def application_dirs():
+    """Return the existing application directories to scan, in priority order."""
+    dirs = []
+    for location in _application_locations():
+        if location == FLATPAK_APP_ROOT:
+            candidates = _flatpak_app_dirs(location)
+        else:
+            candidates = [location]
+        dirs.extend(d for d in candidates if os.path.isdir(d) and os.access(d, os.R_OK))
+    return dirs
+
+
+def _directory_state(dir_path):
+    """Return (mtime_ns, fingerprint, file_names) for an application directory.
 
-        for file_path in globmod.glob(location):
-            if not os.access(file_path, os.R_OK):
+    The directory mtime catches added and removed files; the fingerprint
+    also covers .desktop files edited in place. file_names lists the
+    .desktop files in sorted order.
+    """
+    mtime = os.stat(dir_path).st_mtime_ns
+    stats = []
+    with os.scandir(dir_path) as it:
+        for item in it:
+            if not item.name.endswith('.desktop'):
                 continue
             try:
-                entry = DesktopEntry()
-                entry.parse(file_path)
-                name = entry.getName()
+                st = item.stat()
+            except OSError:
+                continue
+            stats.append((item.name, st.st_mtime_ns, st.st_size))
+    stats.sort()
+    fingerprint = zlib.crc32(repr(stats).encode('utf-8'))
+    return mtime, fingerprint, [name for name, _mtime, _size in stats]
+
+
+def read_browser_file(file_path, langs=None):
+    """Return a [name, file_path, info] entry, or None if not a browser."""
+    try:
+        result = read_desktop_entry(file_path, browsers_only=True, langs=langs)
+    except (OSError, UnicodeDecodeError):
+        return None
+    if result is None:
+        return None
+    return [result[0], file_path, result[1]]
 
-                if name and name.lower() in SELF_NAMES:
-                    continue
 
-                categories = entry.getCategories()
-                if not categories:
-                    continue
+def _locale_key():
+    """Locale settings that affect localized Name= values."""
+    return [os.environ.get(var, '') for var in ('LANGUAGE', 'LC_ALL', 'LC_MESSAGES', 'LANG')]
+
+
+def _load_cache():
+    try:
+        with open(CACHE_FILE, encoding='utf-8') as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+        return {}
+    if data.get("locale") != _locale_key():
+        return {}
+    dirs = data.get("dirs")
+    return dirs if isinstance(dirs, dict) else {}
+
+
+def _save_cache(dirs):
+    """Replace the cache file. Failures are ignored."""
+    data = {"version": CACHE_VERSION, "locale": _locale_key(), "dirs": dirs}
+    try:
+        config.write_json_atomic(CACHE_FILE, data)
+    except OSError:
+        pass
+
+
+def _parse_files(file_paths, workers=None):
+    """Parse .desktop files in input order, on a thread pool of up to
+    workers (default SCAN_WORKERS) threads if there are enough files."""
+    langs = _locale_candidates()
+    workers = min(workers or SCAN_WORKERS, len(file_paths) // MIN_FILES_PER_WORKER)
+    if workers <= 1:
+        return [read_browser_file(p, langs) for p in file_paths]
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda p: read_browser_file(p, langs), file_paths))
 
-                cat_set = {cat.strip().lower() for cat in categories}
-                if cat_set & browser_categories:
-                    browser_files[name] = file_path
-            except Exception:
-                continue
 
-    return list(browser_files.values())
+def scan_directories(use_cache=True):
+    """Return {dir_path: [name, file_path, info] entries} for all
+    application directories, in priority order.
 
+    Cached results are reused for directories whose mtime and
+    fingerprint are unchanged. The .desktop files of all changed
+    directories are parsed together (see _parse_files()); results are
+    reassembled in directory order, so the outcome does not depend on
+    scheduling.
+    """
+    cached_dirs = _load_cache() if use_cache else {}
+    new_dirs = {}
+    changed = not use_cache
 
-def get_browsers():
-    """Get list of installed browsers."""
-    installed = []
-    for file_path in scan_browser_desktop_files():
+    stale = []
+    for dir_path in application_dirs():
         try:
-            info = parse_desktop_entry(file_path)
-            if info:
-                installed.append(info)
-        except Exception:
+            mtime, fingerprint, file_names = _directory_state(dir_path)
+        except OSError:
             continue
+        info = new_dirs[dir_path] = {"mtime": mtime, "fingerprint": fingerprint, "entries": None}
+        cached = cached_dirs.get(dir_path)
+        if (isinstance(cached, dict) and cached.get("mtime") == mtime
+                and cached.get("fingerprint") == fingerprint):
+            info["entries"] = cached["entries"]
+        else:
+            stale.append((info, [os.path.join(dir_path, n) for n in file_names]))
+
+    timings.mark('browser_cache', 'miss' if stale else 'hit')
+    metrics.inc('discovery', 'scan' if stale else 'hit')
+    timings.mark('stale_dirs', len(stale))
+    if stale:
+        changed = True
+        results = iter(_parse_files([path for _info, paths in stale for path in paths]))
+        for info, paths in stale:
+            entries = [next(results) for _ in paths]
+            info["entries"] = [e for e in entries if e is not None]
+
+    if changed or new_dirs.keys() != cached_dirs.keys():
+        _save_cache(new_dirs)
+
+    return {dir_path: info["entries"] for dir_path, info in new_dirs.items()}
+
+
+def _collect_entries(use_cache=True):
+    """Return a dict name -> (file_path, info) over all application
+    directories; entries from later directories override earlier ones
+    with the same name."""
+    return _dedupe(scan_directories(use_cache).values())
+
+
+def _dedupe(entry_lists):
+    browser_files = {}
+    for entries in entry_lists:
+        for name, file_path, info in entries:
+            browser_files[name] = (file_path, info)
+    return browser_files
+
+
+def browsers_from_entries(entry_lists):
+    """Build the sorted browser list from per-directory entry lists.
+
+    entry_lists holds lists of [name, file_path, info] entries in
+    directory priority order, like the values of scan_directories().
+    """
+    installed = [info for _path, info in _dedupe(entry_lists).values() if info]
     return sorted(installed, key=lambda b: b["name"])
+
+
+def scan_browser_desktop_files(use_cache=True):
+    """Find all browser .desktop files on the system."""
+    return [file_path for file_path, _info in _collect_entries(use_cache).values()]
+
+
+def _appinfo_browser(app_info):
+    """Build a browser record from a Gio.DesktopAppInfo, or None if it is not one.
+
+    Applies the same rules as read_desktop_entry(browsers_only=True);
+    GIO has already dropped entries with a failing TryExec.
+    """
+    if not app_info.should_show():
+        return None
+    name = app_info.get_name() or ''
+    if name.lower() in SELF_NAMES:
+        return None
+    categories = {cat.strip().lower() for cat in (app_info.get_categories() or '').split(';')}
+    if not categories & BROWSER_CATEGORIES:
+        return None
+    exec_str = app_info.get_string('Exec') or ''
+    exec_cmd = clean_exec_command(exec_str)
+    if not exec_cmd:
+        return None
+    file_path = app_info.get_filename() or ''
+    argv, quoted = parse_exec(exec_str)
+    return {
+        "name": name,
+        "exec_command": exec_cmd,
+        "exec": exec_str,
+        "argv": argv,
+        "argv_quoted": quoted,
+        "icon": _resolve_icon(app_info.get_string('Icon') or '', file_path),
+        "icon_key": app_info.get_string('Icon') or '',
+        "desktop_file": file_path,
+    }
+
+
+def gio_browsers():
+    """Get installed browsers from GIO's AppInfo registry (mimeinfo.cache,
+    including Flatpak exports), or None when GIO is not available.
+
+    Candidates are the handlers of BROWSER_MIME_TYPES; the first entry
+    with a given name wins, as GIO already orders them by precedence.
+    """
+    try:
+        import gi
+        gi.require_version('Gio', '2.0')
+        from gi.repository import Gio
+    except (ImportError, ValueError):
+        return None
+    browsers = {}
+    seen = set()
+    for mime_type in BROWSER_MIME_TYPES:
+        for app_info in Gio.AppInfo.get_all_for_type(mime_type):
+            app_id = app_info.get_id()
+            if app_id in seen or not isinstance(app_info, Gio.DesktopAppInfo):
+                continue
+            seen.add(app_id)
+            browser = _appinfo_browser(app_info)
+            if browser is not None and browser["name"] not in browsers:
+                browsers[browser["name"]] = browser
+    return sorted(browsers.values(), key=lambda b: b["name"])
+
+
+def get_browsers(use_cache=True, backend=None):
+    """Get list of installed browsers.
+
+    backend defaults to DISCOVERY_BACKEND. With the 'gio' backend, GIO is
+    asked first and the .desktop scan is only used if it is unavailable
+    or finds nothing. With use_cache, unchanged directories are served
+    from the on-disk cache in CACHE_DIR; otherwise everything is
+    rescanned and the cache is rebuilt.
+    """
+    with timings.phase('get_browsers'):
+        if (backend or DISCOVERY_BACKEND) == 'gio':
+            browsers = gio_browsers()
+            if browsers:
+                timings.mark('discovery', 'gio')
+                metrics.inc('discovery', 'gio')
+                return browsers
+        timings.mark('discovery', 'scan')
+        installed = [info for _path, info in _collect_entries(use_cache).values() if info]
+        return sorted(installed, key=lambda b: b["name"])
@@ -1,12 +1,36 @@
-"""Configuration management for BrowserSelector."""
+"""Configuration management for BrowserSelector.
+
+Settings are layered along the XDG config dirs, lowest precedence first:
+
+1. DEFAULTS
+2. config.json in each $XDG_CONFIG_DIRS/browserselector (default
+   /etc/xdg/browserselector); earlier dirs in the list win
+3. the user's ~/.config/browserselector/config.json
+
+An admin may also put a policy.json next to a system config.json:
+"forced_rules" (domain -> browser) win over the user's remembered sites,
+and "allowed_browsers" limits the browsers that are offered at all. The
+merged result is cached in POLICY_CACHE and revalidated by file mtimes.
+"""
 
 import copy
 import json
 import os
+import sqlite3
+import sys
+import threading
+import time
+
+import timings
 
 CONFIG_DIR = os.path.join(os.path.expanduser('~'), '.config', 'browserselector')
 CONFIG_FILE = os.path.join(CONFIG_DIR, 'config.json')
-REMEMBERED_FILE = os.path.join(CONFIG_DIR, 'remembered.json')
+REMEMBERED_FILE = os.path.join(CONFIG_DIR, 'remembered.json')  # legacy, imported once
+REMEMBERED_DB = os.path.join(CONFIG_DIR, 'remembered.db')
+POLICY_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'browserselector', 'policy.json')
+POLICY_CACHE_VERSION = 1
+WRITE_RETRIES = 5  # failed write-behind batches are retried with backoff
+WRITE_RETRY_DELAY = 0.05  # seconds, doubled after each failure
 
 DEFAULTS = {
     "appearance": {
@@ -19,53 +43,380 @@ DEFAULTS = {
 
 
 def load_config():
-    """Load config.json merged with defaults. Returns defaults on error."""
-    config = copy.deepcopy(DEFAULTS)
-    if not os.path.exists(CONFIG_FILE):
-        return config
+    """Load the layered config (see module docstring). Returns defaults on error."""
+    with timings.phase('load_config'):
+        return copy.deepcopy(load_policy()["config"])
+
+
+def system_config_dirs():
+    """System browserselector config dirs, most important first."""
+    dirs = os.environ.get('XDG_CONFIG_DIRS') or '/etc/xdg'
+    return [os.path.join(d, 'browserselector') for d in dirs.split(':') if os.path.isabs(d)]
+
+
+def _layer_files():
+    """Config and policy files, lowest precedence first."""
+    files = []
+    for config_dir in reversed(system_config_dirs()):
+        files.append(os.path.join(config_dir, 'config.json'))
+        files.append(os.path.join(config_dir, 'policy.json'))
+    files.append(CONFIG_FILE)
+    return files
+
+
+def _read_json(path):
     try:
-        with open(CONFIG_FILE, encoding='utf-8') as f:
+        with open(path, encoding='utf-8') as f:
             data = json.load(f)
-        # Deep-merge appearance keys
-        if "appearance" in data and isinstance(data["appearance"], dict):
-            for key in config["appearance"]:
-                if key in data["appearance"]:
-                    config["appearance"][key] = data["appearance"][key]
-        if "default_browser" in data:
-            config["default_browser"] = data["default_browser"]
-        return config
     except (json.JSONDecodeError, OSError):
-        return config
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _merge_config(config, data):
+    """Deep-merge the known keys of one config.json into config."""
+    if "appearance" in data and isinstance(data["appearance"], dict):
+        for key in config["appearance"]:
+            if key in data["appearance"]:
+                config["appearance"][key] = data["appearance"][key]
+    if "default_browser" in data:
+        config["default_browser"] = data["default_browser"]
+
+
+def _compile_policy(files):
+    from rules import normalize_rule
+    merged = {"config": copy.deepcopy(DEFAULTS), "forced_rules": {}, "allowed_browsers": None}
+    for path in files:
+        data = _read_json(path)
+        if not data:
+            continue
+        if os.path.basename(path) == 'config.json':
+            _merge_config(merged["config"], data)
+            continue
+        forced = data.get("forced_rules")
+        if isinstance(forced, dict):
+            for rule, browser in forced.items():
+                rule = normalize_rule(str(rule))
+                if rule and isinstance(browser, str) and browser:
+                    merged["forced_rules"][rule] = browser
+        allowed = data.get("allowed_browsers")
+        if isinstance(allowed, list):
+            merged["allowed_browsers"] = [str(name) for name in allowed]
+    return merged
+
+
+def _file_stamps(files):
+    stamps = []
+    for path in files:
+        try:
+            st = os.stat(path)
+            stamps.append([path, st.st_mtime_ns, st.st_size])
+        except OSError:
+            stamps.append([path, None, None])
+    return stamps
+
+
+def _load_policy_cache():
+    data = _read_json(POLICY_CACHE)
+    if data.get("version") != POLICY_CACHE_VERSION:
+        return None
+    return data
+
+
+def _save_policy_cache(data):
+    """Replace the policy cache. Failures are ignored."""
+    try:
+        write_json_atomic(POLICY_CACHE, data)
+    except OSError:
+        pass
+
+
+_policy = None
+
+
+def load_policy():
+    """Return the merged layers as a dict with "config", "forced_rules"
+    (normalized rule -> browser) and "allowed_browsers" (None = all).
+
+    The result is compiled once and cached in memory and in POLICY_CACHE;
+    both are only rebuilt when a layer file's mtime or size changes, so
+    a lookup costs one stat() per layer file. Treat it as read-only.
+    """
+    global _policy
+    files = _layer_files()
+    stamps = _file_stamps(files)
+    if _policy is not None and _policy["sources"] == stamps:
+        return _policy
+    cached = _load_policy_cache()
+    if cached is not None and cached.get("sources") == stamps:
+        _policy = cached
+        return _policy
+    _policy = _compile_policy(files)
+    _policy["version"] = POLICY_CACHE_VERSION
+    _policy["sources"] = stamps
+    _save_policy_cache(_policy)
+    return _policy
+
+
+def forced_rules():
+    """Return the admin-forced rules, or None if there are none.
+
+    The result maps normalized rule keys to browser names, as stored in
+    POLICY_CACHE, and is queried directly with rules.match_mapping(); no
+    per-process index is built.
+    """
+    return load_policy()["forced_rules"] or None
+
+
+def filter_browsers(browser_list):
+    """Drop browsers that the admin policy does not allow."""
+    allowed = load_policy()["allowed_browsers"]
+    if allowed is None:
+        return browser_list
+    allowed = set(allowed)
+    return [b for b in browser_list if b["name"] in allowed]
+
+
+class FileLock:
+    """Exclusive flock on path + '.lock' for read-modify-write cycles.
+
+    Only writers take it; readers rely on files being replaced atomically.
+    Every instance opens the lock file itself, so it also excludes other
+    threads of the same process; it is not reentrant.
+    """
+
+    def __init__(self, path):
+        self._path = path + '.lock'
+        self._file = None
+
+    def __enter__(self):
+        import fcntl
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        self._file = open(self._path, 'a')
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *_exc):
+        # Closing the file releases the lock
+        self._file.close()
+        self._file = None
+        return False
+
+
+def write_json_atomic(path, data, indent=None, durable=False):
+    """Write data to a temporary file and rename it over path.
+
+    Creates the parent directory if needed. With durable, the data is
+    fsynced before the rename; caches that can be rebuilt skip that.
+    Raises OSError on failure, leaving path untouched.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=indent)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def modify_config(func):
+    """Apply func(data) to the user's config.json under an exclusive lock.
+
+    func receives the file's current contents (a dict, {} if missing) and
+    changes it in place; the result is written atomically, so concurrent
+    writers never lose each other's changes and readers never see a
+    half-written file.
+    """
+    with FileLock(CONFIG_FILE):
+        data = _read_json(CONFIG_FILE)
+        func(data)
+        write_json_atomic(CONFIG_FILE, data, indent=2, durable=True)
+
+
+def update_config(changes):
+    """Merge changes (same layout as DEFAULTS, only the changed keys) into config.json.
+
+    Keys that are not in changes keep whatever is on disk, including
+    values another process saved after this one loaded its config.
+    """
+    def apply(data):
+        for key, value in changes.items():
+            if isinstance(value, dict) and isinstance(data.get(key), dict):
+                data[key].update(value)
+            else:
+                data[key] = copy.deepcopy(value)
+    modify_config(apply)
 
 
 def save_config(config):
-    """Write config.json."""
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-    with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-        json.dump(config, f, indent=2)
+    """Replace config.json with config (atomically, under the config lock)."""
+    with FileLock(CONFIG_FILE):
+        write_json_atomic(CONFIG_FILE, config, indent=2, durable=True)
+
+
+_store = None
+
+
+def remembered_store():
+    """Return the shared RememberedStore, opening it on first use.
+
+    Returns None if the database cannot be opened.
+    """
+    global _store
+    if _store is None:
+        from store import RememberedStore
+        try:
+            _store = RememberedStore(REMEMBERED_DB, legacy_json=REMEMBERED_FILE)
+        except (sqlite3.Error, OSError):
+            return None
+    return _store
 
 
 def load_remembered():
     """Load remembered domain->browser map. Returns {} on error."""
-    if not os.path.exists(REMEMBERED_FILE):
+    store = remembered_store()
+    if store is None:
         return {}
     try:
-        with open(REMEMBERED_FILE, encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, OSError):
+        with timings.phase('load_remembered'):
+            return store.items()
+    except sqlite3.Error:
         return {}
 
 
+def get_remembered(domain):
+    """Return the browser remembered for a single domain key, or None."""
+    store = remembered_store()
+    if store is None:
+        return None
+    try:
+        return store.get(domain)
+    except sqlite3.Error:
+        return None
+
+
+def _write_remembered(method, *args):
+    """Call a write method of the store; log failures and return False."""
+    store = remembered_store()
+    try:
+        if store is None:
+            raise OSError(f"cannot open {REMEMBERED_DB}")
+        getattr(store, method)(*args)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Failed to save remembered sites: {e}", file=sys.stderr)
+        return False
+    return True
+
+
+def set_remembered(domain, browser):
+    """Remember browser for a single domain key. Returns False on error."""
+    return _write_remembered('put', domain, browser)
+
+
+_pending = {}
+_pending_lock = threading.Lock()
+_writer = None
+
+
+def remember_later(domain, browser):
+    """Queue a remembered update to be written by a background thread.
+
+    Pending updates are merged (the last browser per domain wins) and
+    written in one transaction. A failed write (e.g. "database is
+    locked") is retried WRITE_RETRIES times with backoff. The writer is a
+    non-daemon thread, so a normally exiting process still finishes the
+    write; call flush_remembered() to wait for it explicitly.
+    """
+    global _writer
+    with _pending_lock:
+        _pending[domain] = browser
+        if _writer is None:
+            _writer = threading.Thread(target=_write_pending, name='remembered-writer')
+            _writer.start()
+
+
+def _write_pending():
+    global _writer
+    from store import RememberedStore
+    store = None
+    failures = 0
+    try:
+        while True:
+            with _pending_lock:
+                if not _pending or failures > WRITE_RETRIES:
+                    _writer = None
+                    return
+                batch = dict(_pending)
+                _pending.clear()
+            try:
+                # SQLite connections are per thread
+                if store is None:
+                    store = RememberedStore(REMEMBERED_DB, legacy_json=REMEMBERED_FILE)
+                with store.transaction():
+                    for domain, browser in batch.items():
+                        store.put(domain, browser)
+                failures = 0
+            except (sqlite3.Error, OSError) as e:
+                with _pending_lock:
+                    # Put the batch back; updates queued meanwhile are newer
+                    for domain, browser in batch.items():
+                        _pending.setdefault(domain, browser)
+                failures += 1
+                if failures > WRITE_RETRIES:
+                    print(f"Failed to save remembered sites, retrying on flush: {e}", file=sys.stderr)
+                else:
+                    time.sleep(WRITE_RETRY_DELAY * 2 ** (failures - 1))
+    finally:
+        if store is not None:
+            store.close()
+
+
+def flush_remembered():
+    """Block until all queued remembered updates are written.
+
+    Updates the writer thread gave up on are written synchronously.
+    Returns False if that fails too.
+    """
+    while True:
+        with _pending_lock:
+            writer = _writer
+            if writer is None:
+                batch = dict(_pending)
+                _pending.clear()
+        if writer is threading.current_thread():
+            return True
+        if writer is None:
+            break
+        writer.join()
+    return not batch or update_remembered(batch)
+
+
 def save_remembered(data):
-    """Write remembered.json with full domain->browser dict."""
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-    with open(REMEMBERED_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2)
+    """Replace all remembered rules with the full domain->browser dict.
+
+    Returns False on error.
+    """
+    return _write_remembered('replace_all', data)
+
+
+def update_remembered(changes, deleted=()):
+    """Apply a diff to the remembered rules in one transaction.
+
+    changes maps domain -> browser for added or changed rules; deleted
+    lists removed domains. Rules other writers added meanwhile are kept,
+    unlike with save_remembered(). Returns False on error.
+    """
+    return _write_remembered('update', changes, deleted)
 
 
 def delete_remembered(domain):
-    """Remove a single domain from remembered.json."""
-    data = load_remembered()
-    if domain in data:
-        del data[domain]
-        save_remembered(data)
+    """Remove a single domain from the remembered rules. Returns False on error."""
+    return _write_remembered('delete', domain)
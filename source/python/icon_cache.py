@@ -0,0 +1,124 @@
+"""Browser icons pre-rendered at the configured icon size.
+
+File-based icons (AppImage icons, absolute paths in Icon=) are decoded
+once at full size and stored as small PNGs in ICON_CACHE_DIR, named
+"<size>-<hash of source path, mtime and file size>.png". Themed icon
+names are left to GTK, whose icon theme already provides sized variants.
+
+Preparing (rendering and evicting) and loading the icons happen under
+one lock shared by all threads and processes, so a rebuild for a new
+size never deletes files another chooser is about to load.
+"""
+
+import hashlib
+import os
+import threading
+
+import gi
+gi.require_version('Gdk', '4.0')
+gi.require_version('GdkPixbuf', '2.0')
+from gi.repository import Gdk, GdkPixbuf, GLib
+
+from browser_scan import CACHE_DIR
+from config import FileLock
+
+ICON_CACHE_DIR = os.path.join(CACHE_DIR, 'icons')
+
+
+def _cache_path(source, size):
+    st = os.stat(source)
+    key = f"{source}\0{st.st_mtime_ns}\0{st.st_size}"
+    return os.path.join(ICON_CACHE_DIR, f"{size}-{hashlib.sha1(key.encode('utf-8')).hexdigest()}.png")
+
+
+def _render(source, size, dest):
+    pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(source, size, size, True)
+    os.makedirs(ICON_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{dest}.{os.getpid()}.{threading.get_ident()}.tmp"
+    pixbuf.savev(tmp_path, 'png', [], [])
+    os.replace(tmp_path, dest)
+
+
+def icon_file(icon, size):
+    """Return a cached, pre-scaled PNG for a file icon (rendering it on a miss).
+
+    Returns icon unchanged if it cannot be cached, and None for themed
+    icon names.
+    """
+    if not os.path.isfile(icon):
+        return None
+    try:
+        dest = _cache_path(icon, size)
+        if not os.path.exists(dest):
+            _render(icon, size, dest)
+        return dest
+    except (OSError, GLib.Error):
+        return icon
+
+
+def _cache_lock():
+    return FileLock(ICON_CACHE_DIR)
+
+
+def _prepare(browsers, size):
+    paths = {b["name"]: icon_file(b["icon"], size) for b in browsers}
+    evict(p for p in paths.values() if p)
+    return paths
+
+
+def prepare_icons(browsers, size):
+    """Return {browser name: file to load or None} and evict stale entries."""
+    with _cache_lock():
+        return _prepare(browsers, size)
+
+
+def evict(keep):
+    """Delete cached icons not in keep: those of uninstalled browsers,
+    changed files or another icon size. Call with the cache lock held.
+    """
+    keep = {os.path.basename(p) for p in keep}
+    try:
+        names = os.listdir(ICON_CACHE_DIR)
+    except OSError:
+        return
+    for name in names:
+        if name in keep:
+            continue
+        try:
+            os.unlink(os.path.join(ICON_CACHE_DIR, name))
+        except OSError:
+            pass
+
+
+def load_in_background(browsers, size, on_loaded):
+    """Prepare and decode icons on a worker thread.
+
+    on_loaded({browser name: Gdk.Texture or None}) is then called on the
+    main loop; None means the browser's themed icon name should be used.
+    """
+    browsers = list(browsers)
+
+    def work():
+        textures = {}
+        # Held until the files are decoded, so no rebuild evicts them first
+        with _cache_lock():
+            for name, path in _prepare(browsers, size).items():
+                texture = None
+                if path:
+                    try:
+                        texture = Gdk.Texture.new_from_filename(path)
+                    except GLib.Error:
+                        pass
+                textures[name] = texture
+        GLib.idle_add(on_loaded, textures)
+
+    thread = threading.Thread(target=work, daemon=True)
+    thread.start()
+    return thread
+
+
+def rebuild_in_background(browsers, size):
+    """Render all icons for a new size on a worker thread."""
+    thread = threading.Thread(target=prepare_icons, args=(list(browsers), size))
+    thread.start()
+    return thread
@@ -0,0 +1,204 @@
+"""Launching browsers as detached processes.
+
+Browser records carry an argv template parsed from their Exec= line at
+scan time (browser_scan.parse_exec); expand_exec() fills in the field
+codes and spawn() starts the result with os.posix_spawnp in a new
+session. Set BROWSERSELECTOR_SPAWN=popen to use subprocess.Popen instead,
+e.g. to compare launch latency with --timings. Warm spawns cost about
+the same either way, but a click on a remembered site runs in a fresh
+process, where Popen first has to import subprocess (about 5 ms;
+spawn_first/* in benchmarks/run.py).
+"""
+
+import os
+import sys
+
+import metrics
+import timings
+from browser_scan import parse_exec
+
+SPAWN_METHOD = os.environ.get('BROWSERSELECTOR_SPAWN', 'posix_spawn')
+
+
+def _file_arg(url):
+    """%f/%F take file paths: file:// URLs are converted, anything else is passed as is."""
+    if url.startswith('file://'):
+        from urllib.parse import unquote, urlparse
+        return unquote(urlparse(url).path)
+    return url
+
+
+def _shell_quote(value):
+    """Quote value for a POSIX shell, as g_shell_quote() does."""
+    return "'" + value.replace("'", "'\\''") + "'"
+
+
+def _expand_token(token, urls, browser, quote=False):
+    """Fill in the field codes of one argument. With quote=True (a quoted
+    argument, e.g. sh -c "echo %u") each substituted value is shell-quoted,
+    so a URL can never inject commands."""
+    def values(code):
+        if code == 'u':
+            return urls[:1]
+        if code == 'f':
+            return [_file_arg(u) for u in urls[:1]]
+        if code == 'U':
+            return urls
+        if code == 'F':
+            return [_file_arg(u) for u in urls]
+        if code == 'c':
+            return [browser.get("name", '')]
+        if code == 'k':
+            return [browser.get("desktop_file", '')]
+        return []  # %i inside a token, deprecated and unknown codes
+
+    def field(code):
+        if code == '%':
+            return '%'
+        if quote:
+            return ' '.join(_shell_quote(v) for v in values(code))
+        return ' '.join(values(code))
+
+    out = []
+    i = 0
+    while i < len(token):
+        if token[i] == '%' and i + 1 < len(token):
+            out.append(field(token[i + 1]))
+            i += 2
+        else:
+            out.append(token[i])
+            i += 1
+    return ''.join(out)
+
+
+def _expand(template, quoted, urls, browser):
+    argv = []
+    for index, token in enumerate(template):
+        if index in quoted:
+            if '%' in token:
+                token = _expand_token(token, urls, browser, quote=True)
+            argv.append(token)
+        elif token == '%U':
+            argv.extend(urls)
+        elif token == '%F':
+            argv.extend(_file_arg(u) for u in urls)
+        elif token == '%i':
+            # Only for an entry with an Icon= key, not the fallback icon
+            icon = browser.get("icon_key")
+            if icon:
+                argv.extend(['--icon', icon])
+        elif '%' not in token:
+            argv.append(token)
+        else:
+            # Arguments that expand to nothing (e.g. %u without a URL) are dropped
+            expanded = _expand_token(token, urls, browser)
+            if expanded:
+                argv.append(expanded)
+    return argv
+
+
+def _field_codes(template):
+    codes = set()
+    for token in template:
+        i = token.find('%')
+        while i != -1 and i + 1 < len(token):
+            codes.add(token[i + 1])
+            i = token.find('%', i + 2)
+    return codes
+
+
+def expand_exec(browser, urls):
+    """Return the argv lists needed to open urls in browser.
+
+    A %U/%F entry gets all URLs in one command, %u/%f one command per URL.
+    Without any of these field codes the URL is appended at the end, one
+    command per URL, as earlier versions did.
+    """
+    template, quoted = browser.get("argv"), browser.get("argv_quoted")
+    if template is None or quoted is None:
+        template, quoted = parse_exec(browser.get("exec") or browser["exec_command"])
+    quoted = set(quoted)
+    if not urls:
+        return [_expand(template, quoted, [], browser)]
+    codes = _field_codes(template)
+    if 'U' in codes or 'F' in codes:
+        return [_expand(template, quoted, list(urls), browser)]
+    if 'u' in codes or 'f' in codes:
+        return [_expand(template, quoted, [url], browser) for url in urls]
+    base = _expand(template, quoted, [], browser)
+    return [base + [url] for url in urls]
+
+
+_children = []
+
+
+def _reap_finished():
+    """Collect exited children from earlier spawns, so a long-running
+    --daemon does not accumulate zombies (Popen does the same on each call)."""
+    for pid in list(_children):
+        try:
+            done, _status = os.waitpid(pid, os.WNOHANG)
+        except ChildProcessError:
+            done = pid
+        if done:
+            _children.remove(pid)
+
+
+def _spawn_posix(argv):
+    pid = os.posix_spawnp(
+        argv[0], argv, os.environ,
+        file_actions=[
+            (os.POSIX_SPAWN_OPEN, 0, os.devnull, os.O_RDONLY, 0),
+            (os.POSIX_SPAWN_OPEN, 1, os.devnull, os.O_WRONLY, 0),
+            (os.POSIX_SPAWN_DUP2, 1, 2),
+        ],
+        setsid=True,
+    )
+    _children.append(pid)
+    return pid
+
+
+def _spawn_popen(argv):
+    import subprocess
+    proc = subprocess.Popen(
+        argv,
+        start_new_session=True,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return proc.pid
+
+
+def spawn(argv, method=None):
+    """Start argv fully detached. Returns the pid, or None on failure."""
+    method = method or SPAWN_METHOD
+    if method != 'popen' and not hasattr(os, 'posix_spawnp'):
+        method = 'popen'
+    timings.mark('spawn_method', method)
+    _reap_finished()
+    try:
+        with timings.phase('spawn'):
+            if method == 'popen':
+                return _spawn_popen(argv)
+            return _spawn_posix(argv)
+    except Exception as e:
+        print(f"Failed to launch browser: {e}", file=sys.stderr)
+        return None
+
+
+def launch_urls(browser, urls):
+    """Open urls in browser, one process per expanded command line.
+    Returns True if every command line was started."""
+    name = browser.get("name", "")
+    commands = expand_exec(browser, urls)
+    # Either one command per URL or one command for all of them
+    per_command = 1 if len(commands) == len(urls) else len(urls)
+    launched = 0
+    for argv in commands:
+        if argv and spawn(argv) is not None:
+            metrics.inc('launches', name)
+            metrics.inc('urls', name, per_command)
+            launched += 1
+    return launched == len(commands)
+
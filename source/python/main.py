@@ -1,206 +1,215 @@
 #!/usr/bin/env python3
-"""BrowserSelector - Choose which browser opens your links."""
+"""BrowserSelector - Choose which browser opens your links.
 
-import gi
-import subprocess
-import sys
-import os
-import shlex
-from urllib.parse import urlparse
+Remembered domains are resolved and launched here without importing GTK;
+the selector module (and with it gi/Gtk) is only loaded when a window is
+actually shown.
+"""
+
+import timings  # first, so its clock starts before the other imports
 
-gi.require_version('Gtk', '4.0')
-from gi.repository import Gtk, Gdk
+import argparse
+import itertools
+import json
+import sqlite3
+import sys
 
 import config
+import metrics
 from browser_scan import get_browsers
-from settings import SettingsWindow
+from launcher import launch_urls
+from remote import forward_to_primary
+from routing import resolve_urls, route_urls
 
-APP_ID = 'com.github.browserselector'
+# store.MERGE_STRATEGIES and rules_io.FORMATS, spelled out so that the
+# remembered-site path does not import csv and rules_io
+MERGE_STRATEGIES = ('keep-local', 'prefer-incoming', 'replace')
+RULE_FORMATS = ('jsonl', 'csv')
 
 
-def launch_browser(exec_command, url):
-    """Launch a browser with the given URL, fully detached."""
-    try:
-        args = shlex.split(exec_command)
-        if url:
-            args.append(url)
-        subprocess.Popen(
-            args,
-            start_new_session=True,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-        )
-    except Exception as e:
-        print(f"Failed to launch browser: {e}", file=sys.stderr)
-
-
-def on_activate(app, url):
-    """Main activation handler."""
-    browser_list = get_browsers()
-    cfg = config.load_config()
-    remembered = config.load_remembered()
-    appearance = cfg["appearance"]
-
-    # Auto-launch remembered browser for this domain
-    if url:
-        domain = urlparse(url).netloc
-        saved_name = remembered.get(domain) if domain else None
-        if saved_name:
-            for browser in browser_list:
-                if browser["name"] == saved_name:
-                    launch_browser(browser["exec_command"], url)
-                    app.quit()
-                    return
-
-    # Find default browser for highlighting (no auto-launch)
-    default_browser = None
-    if cfg["default_browser"]:
-        for browser in browser_list:
-            if browser["name"] == cfg["default_browser"]:
-                default_browser = browser
-                break
-
-    # Build selector window
-    win = Gtk.ApplicationWindow(application=app, title="Browser Selector")
-    win.set_icon_name("applications-internet")
-    win.set_decorated(False)
-    win.set_resizable(False)
-    win.set_default_size(-1, -1)
-
-    css_provider = Gtk.CssProvider()
-    css = f"""
-    window {{
-        background-color: @theme_bg_color;
-        border-radius: {appearance["border_radius"]}px;
-    }}
-    .browser-btn {{
-        min-width: 80px;
-        min-height: 36px;
-    }}
-    .url-label {{
-        font-size: 11px;
-        opacity: 0.7;
-    }}
-    """
-    css_provider.load_from_string(css)
-    display = Gdk.Display.get_default()
-    Gtk.StyleContext.add_provider_for_display(
-        display, css_provider, Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='browserselector',
+        description="Choose which browser opens your links.",
     )
+    parser.add_argument('urls', nargs='*', metavar='URL', help="URLs to open")
+    parser.add_argument('--stdin', action='store_true',
+                        help="also read URLs from standard input, one per line")
+    parser.add_argument('--settings', action='store_true',
+                        help="open the settings window")
+    parser.add_argument('--rescan', action='store_true',
+                        help="ignore the browser cache and rescan .desktop files")
+    parser.add_argument('--daemon', action='store_true',
+                        help="stay resident with a prepared selector window")
+    parser.add_argument('--idle-timeout', type=int, default=None, metavar='SECONDS',
+                        help="exit the daemon after this long without requests (0 = never)")
+    parser.add_argument('--reload', action='store_true',
+                        help="make a running daemon reload browsers and config")
+    parser.add_argument('--resolve', action='store_true',
+                        help="print the browser each URL would open in as JSON lines, "
+                             "without opening anything (reads standard input if no URL is given)")
+    parser.add_argument('--import-rules', metavar='FILE',
+                        help="merge remembered rules from a JSON Lines or CSV file ('-' = stdin)")
+    parser.add_argument('--export-rules', metavar='FILE',
+                        help="write remembered rules as JSON Lines or CSV ('-' = stdout)")
+    parser.add_argument('--merge', choices=MERGE_STRATEGIES, default='keep-local',
+                        help="how --import-rules treats domains that already have a rule "
+                             "(default: %(default)s)")
+    parser.add_argument('--format', choices=RULE_FORMATS,
+                        help="rules file format (default: csv for *.csv, otherwise jsonl)")
+    parser.add_argument('--metrics', action='store_true',
+                        help="print the usage counters in OpenMetrics text format")
+    parser.add_argument('--metrics-format', choices=('openmetrics', 'prometheus'), default='openmetrics',
+                        help="use 'prometheus' for node_exporter's textfile collector "
+                             "(default: %(default)s)")
+    parser.add_argument('--timings', action='store_true',
+                        help="append per-phase startup timings as JSON to "
+                             "~/.cache/browserselector/timings.jsonl")
+    return parser.parse_args(argv)
+
+
+def resolve(urls, use_cache=True):
+    """Yield (url, result) routing results without launching anything or loading GTK.
+
+    Browsers, remembered rules and config are loaded once; see
+    routing.resolve_urls() for the result format.
+    """
+    remembered = config.load_remembered()
+    default_browser = config.load_config()["default_browser"]
+    browser_list = config.filter_browsers(get_browsers(use_cache=use_cache))
+    return resolve_urls(urls, browser_list, remembered, default_browser, config.forced_rules())
+
 
-    main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
-    main_box.set_margin_top(20)
-    main_box.set_margin_bottom(20)
-    main_box.set_margin_start(20)
-    main_box.set_margin_end(20)
-
-    # Gear button (top-right)
-    header_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
-    header_box.set_halign(Gtk.Align.END)
-    gear_btn = Gtk.Button()
-    gear_btn.set_icon_name("emblem-system")
-    gear_btn.set_tooltip_text("Settings")
-    gear_btn.add_css_class("flat")
-    gear_btn.connect('clicked', lambda _: SettingsWindow(
-        browsers=browser_list, on_save=lambda c: None
-    ).present())
-    header_box.append(gear_btn)
-    main_box.append(header_box)
-
-    # Show the URL being opened
-    if url:
-        url_label = Gtk.Label(label=url)
-        url_label.set_ellipsize(3)  # PANGO_ELLIPSIZE_END
-        url_label.add_css_class("url-label")
-        url_label.set_selectable(True)
-        main_box.append(url_label)
-
-    # Browser buttons grid
-    columns = appearance["grid_columns"]
-    grid = Gtk.Grid()
-    grid.set_column_spacing(15)
-    grid.set_row_spacing(15)
-    grid.set_halign(Gtk.Align.CENTER)
-
-    remember_checkbox = Gtk.CheckButton(label="Remember for this site")
-    remember_checkbox.set_active(True)
-
-    def on_button_clicked(browser):
-        if remember_checkbox.get_active() and url:
-            domain = urlparse(url).netloc
-            if domain:
-                data = config.load_remembered()
-                data[domain] = browser["name"]
-                config.save_remembered(data)
-        launch_browser(browser["exec_command"], url)
-        win.close()
-
-    for i, browser in enumerate(browser_list):
-        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
-        vbox.set_halign(Gtk.Align.CENTER)
-
-        icon_path = browser["icon"]
-        if os.path.isfile(icon_path):
-            icon = Gtk.Image.new_from_file(icon_path)
-        else:
-            icon = Gtk.Image.new_from_icon_name(icon_path)
-        icon.set_pixel_size(appearance["icon_size"])
-        vbox.append(icon)
-
-        btn = Gtk.Button(label=browser["name"])
-        btn.add_css_class("browser-btn")
-        if default_browser and browser["name"] == default_browser["name"]:
-            btn.add_css_class("suggested-action")
-        btn.connect('clicked', lambda _, b=browser: on_button_clicked(b))
-        vbox.append(btn)
-        grid.attach(vbox, i % columns, i // columns, 1, 1)
-
-    if not browser_list:
-        no_browsers = Gtk.Label(label="No browsers found on this system.")
-        grid.attach(no_browsers, 0, 0, columns, 1)
-
-    main_box.append(grid)
-
-    if url:
-        main_box.append(remember_checkbox)
-
-    win.set_child(main_box)
-
-    # Keyboard shortcuts: Enter = launch default, Escape = close
-    # CAPTURE phase so window intercepts before focused child widgets
-    key_ctrl = Gtk.EventControllerKey()
-    key_ctrl.set_propagation_phase(Gtk.PropagationPhase.CAPTURE)
-    def on_key_pressed(_ctrl, keyval, _keycode, _state):
-        if keyval == Gdk.KEY_Return and default_browser:
-            on_button_clicked(default_browser)
-            return True
-        if keyval == Gdk.KEY_Escape:
-            win.close()
-            return True
-        return False
-    key_ctrl.connect('key-pressed', on_key_pressed)
-    win.add_controller(key_ctrl)
-
-    win.present()
-
-
-def on_settings_activate(app):
-    """Open settings window directly (--settings mode)."""
-    SettingsWindow(browsers=get_browsers(), application=app).present()
+def _write_resolved(urls, use_cache):
+    """Print one JSON object per URL; the part after "url" is encoded once per outcome."""
+    write = sys.stdout.write
+    tails = {}
+    try:
+        for url, result in resolve(urls, use_cache):
+            cached = tails.get(id(result))
+            if cached is None:
+                # Keep result referenced so its id stays unique
+                cached = tails[id(result)] = (result, ', ' + json.dumps(result)[1:] + '\n')
+            write('{"url": ' + json.dumps(url) + cached[1])
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # Output piped into e.g. head; stop quietly
+        sys.stdout = None
+
+
+def _transfer_rules(args):
+    """Run --import-rules and/or --export-rules; return the exit status."""
+    import csv
+    import rules_io
+    store = config.remembered_store()
+    if store is None:
+        print("Cannot open the remembered rules database", file=sys.stderr)
+        return 1
+    try:
+        if args.import_rules:
+            counts = rules_io.import_rules(store, args.import_rules, args.merge, args.format)
+            print(rules_io.format_report("Imported", args.import_rules, counts,
+                                         counts["read"] + counts["invalid"]), file=sys.stderr)
+        if args.export_rules:
+            counts = rules_io.export_rules(store, args.export_rules, args.format)
+            print(rules_io.format_report("Exported", args.export_rules, counts, counts["written"]),
+                  file=sys.stderr)
+    except BrokenPipeError:
+        # Export piped into e.g. head; stop quietly
+        sys.stdout = None
+    except (OSError, sqlite3.Error, ValueError, csv.Error) as e:
+        print(f"Rules transfer failed: {e}", file=sys.stderr)
+        return 1
+    return 0
 
 
 def main():
+    # Checked before parsing, so that the imports and parse_args are timed too
+    if '--timings' in sys.argv[1:]:
+        timings.enable()
+    timings.since_start('imports')
+    with timings.phase('parse_args'):
+        args = parse_args()
+    if args.timings:
+        timings.enable()
+    use_cache = not args.rescan
+
     # Handle --settings flag: open settings without a URL
-    if '--settings' in sys.argv:
-        app = Gtk.Application(application_id=APP_ID + '.settings')
-        app.connect('activate', on_settings_activate)
-        app.run(None)
+    if args.settings:
+        import selector
+        selector.run_settings(use_cache)
+        return
+
+    if args.daemon:
+        import selector
+        idle_timeout = args.idle_timeout
+        if idle_timeout is None:
+            idle_timeout = selector.DEFAULT_IDLE_TIMEOUT
+        selector.run_daemon(use_cache, idle_timeout)
+        return
+
+    if args.metrics:
+        sys.stdout.write(metrics.render(openmetrics=args.metrics_format == 'openmetrics'))
+        return
+
+    if args.import_rules or args.export_rules:
+        sys.exit(_transfer_rules(args))
+
+    if args.resolve:
+        urls = args.urls
+        if args.stdin or not urls:
+            # Stream standard input: history exports can hold millions of URLs
+            stdin_urls = (line.strip() for line in sys.stdin)
+            urls = itertools.chain(urls, (url for url in stdin_urls if url))
+        _write_resolved(urls, use_cache)
+        return
+
+    urls = list(args.urls)
+    if args.stdin:
+        urls.extend(line.strip() for line in sys.stdin if line.strip())
+
+    forward_args = ['browserselector']
+    if args.reload or args.rescan:
+        forward_args.append('--reload')
+    if args.reload and not urls:
+        forward_to_primary(forward_args)
+        return
+
+    # Fast path: forced and remembered domains are launched without touching
+    # GTK, one process per browser where its Exec line takes a URL list (%U)
+    browser_list = config.filter_browsers(get_browsers(use_cache=use_cache))
+    routes, unresolved = {}, urls
+    with timings.phase('load_remembered'):
+        store = config.remembered_store()
+        if urls:
+            try:
+                routes, unresolved = route_urls(urls, browser_list, store if store is not None else {},
+                                                config.forced_rules())
+            except sqlite3.Error:
+                pass
+    timings.mark('remembered', 'hit' if routes else 'miss')
+    opened = 0
+    with timings.phase('launch'):
+        for browser, browser_urls in routes.values():
+            if launch_urls(browser, browser_urls):
+                opened += len(browser_urls)
+    if opened:
+        metrics.observe_launch_since_start('rule')
+        metrics.inc('routes', 'rule', opened)
+    metrics.inc('routes', 'chooser', len(unresolved))
+    if routes and not unresolved:
+        return
+
+    # A running instance (e.g. --daemon) already has a window ready
+    with timings.phase('forward'):
+        forwarded = forward_to_primary(forward_args + unresolved)
+    timings.mark('forwarded', forwarded)
+    if forwarded:
         return
 
-    url = sys.argv[1] if len(sys.argv) > 1 else ""
-    app = Gtk.Application(application_id=APP_ID)
-    app.connect('activate', lambda a: on_activate(a, url))
-    app.run(None)
+    with timings.phase('import_gi'):
+        import selector
+    selector.run_selector(unresolved, browser_list, config.load_config())
 
 
 if __name__ == '__main__':
@@ -0,0 +1,153 @@
+"""Long-lived usage counters, rendered as OpenMetrics text.
+
+Counters are collected in memory during a run and added to METRICS_FILE
+once at exit (or on flush()), under an flock and with an atomic
+replace, so concurrent clicks never lose increments and a crash never
+leaves a torn file. Set BROWSERSELECTOR_METRICS=0 to turn them off.
+
+Counted are launches and opened URLs per browser, how URLs were routed
+(by a remembered or forced rule, or through the chooser), discovery
+cache hits and rescans, and a histogram of click-to-launch latency.
+"""
+
+import os
+
+import timings
+
+ENV_VAR = 'BROWSERSELECTOR_METRICS'
+METRICS_FILE = os.path.join(os.path.expanduser('~'), '.cache', 'browserselector', 'metrics.json')
+METRICS_VERSION = 1
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)  # seconds, le
+
+enabled = os.environ.get(ENV_VAR, '1') != '0'
+_pending = {}
+_registered = False
+
+
+def _empty():
+    return {"version": METRICS_VERSION, "launches": {}, "urls": {}, "routes": {},
+            "discovery": {}, "latency": {}}
+
+
+def inc(family, key, amount=1):
+    """Add amount to counter family[key] (e.g. inc('launches', 'Firefox'))."""
+    if not enabled or not amount:
+        return
+    global _registered
+    if not _registered:
+        import atexit
+        atexit.register(flush)
+        _registered = True
+    counters = _pending.setdefault(family, {})
+    counters[key] = counters.get(key, 0) + amount
+
+
+def observe_latency(path, seconds):
+    """Record one click-to-launch latency for path ('rule' or 'chooser')."""
+    if not enabled:
+        return
+    for i, bound in enumerate(LATENCY_BUCKETS):
+        if seconds <= bound:
+            break
+    else:
+        i = len(LATENCY_BUCKETS)
+    inc('latency', (path, i))
+    inc('latency', (path, 'sum'), seconds)
+
+
+def observe_launch_since_start(path='rule'):
+    """Record the time from process start (the click on a link) until now,
+    including interpreter start-up (see timings.since_exec())."""
+    observe_latency(path, timings.since_exec())
+
+
+def _add(data, pending):
+    for family, counters in pending.items():
+        target = data.setdefault(family, {})
+        for key, amount in counters.items():
+            if family == 'latency':
+                path, slot = key
+                hist = target.setdefault(path, {"buckets": [0] * (len(LATENCY_BUCKETS) + 1), "sum": 0.0})
+                if slot == 'sum':
+                    hist["sum"] += amount
+                else:
+                    hist["buckets"][slot] += amount
+            else:
+                target[key] = target.get(key, 0) + amount
+
+
+def read():
+    """Return the stored counters (without this run's pending ones)."""
+    import json
+    try:
+        with open(METRICS_FILE, encoding='utf-8') as f:
+            data = json.load(f)
+    except (ValueError, OSError):
+        return _empty()
+    if not isinstance(data, dict) or data.get("version") != METRICS_VERSION:
+        return _empty()
+    return data
+
+
+def flush():
+    """Add the pending counters to METRICS_FILE. Failures are ignored."""
+    global _pending
+    if not _pending:
+        return
+    import config
+    pending, _pending = _pending, {}
+    try:
+        with config.FileLock(METRICS_FILE):
+            data = read()
+            _add(data, pending)
+            config.write_json_atomic(METRICS_FILE, data)
+    except OSError:
+        pass
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render(data=None, openmetrics=True):
+    """Render counters as OpenMetrics text, or with openmetrics=False as
+    Prometheus text format (as read by node_exporter's textfile collector)."""
+    data = data or read()
+    lines = []
+
+    def family(name, kind, help_text, samples):
+        # OpenMetrics names counter families without the _total suffix
+        type_name = name[:-len('_total')] if openmetrics and name.endswith('_total') else name
+        lines.append(f"# HELP {type_name} {help_text}")
+        lines.append(f"# TYPE {type_name} {kind}")
+        lines.extend(samples)
+
+    def counter(name, help_text, label, values):
+        family(name, 'counter', help_text,
+               [f'{name}{{{label}="{_escape(k)}"}} {v}' for k, v in sorted(values.items())])
+
+    counter('browserselector_launches_total', "Browser processes started.", 'browser',
+            data.get("launches", {}))
+    counter('browserselector_urls_opened_total', "URLs opened.", 'browser', data.get("urls", {}))
+    counter('browserselector_urls_routed_total',
+            "URLs by how their browser was chosen (rule = remembered or forced, chooser = window shown).",
+            'route', data.get("routes", {}))
+    counter('browserselector_discovery_total',
+            "Browser discovery runs (hit = served from cache, scan = .desktop files parsed, gio = GIO).",
+            'result', data.get("discovery", {}))
+
+    samples = []
+    for path, hist in sorted(data.get("latency", {}).items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), hist["buckets"]):
+            cumulative += count
+            samples.append(f'browserselector_launch_latency_seconds_bucket{{path="{_escape(path)}",le="{bound}"}} {cumulative}')
+        samples.append(f'browserselector_launch_latency_seconds_count{{path="{_escape(path)}"}} {cumulative}')
+        samples.append(f'browserselector_launch_latency_seconds_sum{{path="{_escape(path)}"}} {hist["sum"]:.6f}')
+    family('browserselector_launch_latency_seconds', 'histogram',
+           "Time from the link click (process start) or chooser button press to the browser launch.",
+           samples)
+
+    if openmetrics:
+        lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,39 @@
+"""Forwarding a command line to a running BrowserSelector instance.
+
+Only Gio is imported here, so handing a URL to a resident --daemon
+instance skips loading GTK in the short-lived client process.
+"""
+
+APP_ID = 'com.github.browserselector'
+
+
+def forward_to_primary(argv):
+    """Send argv to the primary instance if one owns APP_ID on the session bus.
+
+    Returns True when the command line was delivered, False when no
+    instance is running (or D-Bus is unavailable) and the caller has to
+    handle the request itself.
+    """
+    try:
+        import gi
+        gi.require_version('Gio', '2.0')
+        from gi.repository import Gio, GLib
+
+        bus = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+        reply = bus.call_sync(
+            'org.freedesktop.DBus', '/org/freedesktop/DBus', 'org.freedesktop.DBus',
+            'NameHasOwner', GLib.Variant('(s)', (APP_ID,)), GLib.VariantType('(b)'),
+            Gio.DBusCallFlags.NONE, -1, None,
+        )
+        if not reply.unpack()[0]:
+            return False
+
+        app = Gio.Application(application_id=APP_ID,
+                              flags=Gio.ApplicationFlags.HANDLES_COMMAND_LINE)
+        app.register(None)
+        if not app.get_is_remote():
+            return False
+        app.run(argv)
+        return True
+    except Exception:
+        return False
@@ -0,0 +1,150 @@
+"""Deciding which browser handles a URL, without any GTK imports."""
+
+import re
+from urllib.parse import urlparse, urlsplit
+
+from rules import match_mapping, normalize_host
+
+MAX_RESOLVE_HOSTS = 100000  # per-host results memoized by resolve_urls()
+_URL_HOST_RE = re.compile(r'([A-Za-z][A-Za-z0-9+.-]*)://([^/?#]*)')
+
+
+def url_domain(url):
+    """Return the normalized host key used for remembered domains.
+
+    Returns "" for URLs without a host and for malformed ones.
+    """
+    if not url:
+        return ""
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return ""
+    return normalize_host(parsed.netloc, parsed.scheme) if parsed.netloc else ""
+
+
+def _url_host(url):
+    """Return (netloc, scheme) of url; a regex handles the common
+    scheme://host/... form several times faster than urlsplit()."""
+    match = _URL_HOST_RE.match(url)
+    if match:
+        return match.group(2), match.group(1).lower()
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return '', ''
+    return parts.netloc, parts.scheme
+
+
+def find_browser(browser_list, name):
+    """Return the browser record called name, or None."""
+    if not name:
+        return None
+    for browser in browser_list:
+        if browser["name"] == name:
+            return browser
+    return None
+
+
+def match_rule(host_key, remembered, forced=None):
+    """Return (rule key, browser name) of the rule for a normalized host key.
+
+    The rule key is None for a match in forced (config.forced_rules()),
+    which wins over remembered. remembered is a dict of normalized rules
+    or anything with a dict-like get(), such as config.remembered_store();
+    see rules.match_mapping(). Returns None without a match. Both the
+    launch path and the --resolve dry run decide through this function.
+    """
+    if forced:
+        match = match_mapping(forced, host_key)
+        if match:
+            return None, match[1]
+    return match_mapping(remembered, host_key)
+
+
+def remembered_browser_name(url, remembered, forced=None):
+    """Return the browser name remembered (or forced) for url's host, or None.
+
+    Exact, '*.suffix' and '.parent' rules are matched as described in
+    the rules module, through match_rule(). Malformed URLs (e.g.
+    'http://[oops/') match no rule, so route_urls() leaves them to the
+    chooser.
+    """
+    if not url:
+        return None
+    netloc, scheme = _url_host(url)
+    if not netloc:
+        return None
+    match = match_rule(normalize_host(netloc, scheme), remembered, forced)
+    return match[1] if match else None
+
+
+def route_urls(urls, browser_list, remembered, forced=None):
+    """Split urls into remembered (or forced) routes and URLs that need the chooser.
+
+    Returns (routes, unresolved): routes maps browser name to
+    (browser, [urls]) in first-seen order; unresolved keeps input order.
+    """
+    routes = {}
+    unresolved = []
+    for url in urls:
+        browser = find_browser(browser_list, remembered_browser_name(url, remembered, forced))
+        if browser is None:
+            unresolved.append(url)
+        elif browser["name"] in routes:
+            routes[browser["name"]][1].append(url)
+        else:
+            routes[browser["name"]] = (browser, [url])
+    return routes, unresolved
+
+
+def resolve_urls(urls, browser_list, remembered, default_browser=None, forced=None):
+    """Dry-run routing: yield (url, result) for each URL, in input order.
+
+    result is a dict with "browser" (a name or None) and "source":
+    "forced" when an admin-forced rule (forced is a dict of normalized
+    rules, see config.forced_rules()) launches the browser directly,
+    "remembered" when a remembered rule does, "default" when the chooser
+    would open with default_browser pre-selected, and "prompt" when it
+    would open without one. A matched remembered rule is reported as
+    "rule"; if the browser of a matched rule is not installed,
+    "rule_browser" names it and the URL falls through to the chooser.
+    Result dicts are shared between URLs with the same outcome and must
+    not be modified.
+
+    urls may be any iterable (e.g. a file streamed line by line); rules
+    are matched with match_rule(), like on launch, and outcomes are
+    memoized per host.
+    """
+    installed = {b["name"] for b in browser_list}
+    if default_browser not in installed:
+        default_browser = None
+    source, browser = ("default", default_browser) if default_browser else ("prompt", None)
+    fallback = {"browser": browser, "source": source}
+    outcomes = {}  # matched (rule or None if forced, browser) -> shared result
+    hosts = {}
+
+    for url in urls:
+        host = _url_host(url)
+        result = hosts.get(host)
+        if result is None:
+            match = match_rule(normalize_host(*host), remembered, forced) if host[0] else None
+            if match is None:
+                result = fallback
+            else:
+                result = outcomes.get(match)
+                if result is None:
+                    rule, browser = match
+                    if browser not in installed:
+                        result = dict(fallback, rule_browser=browser)
+                        if rule is not None:
+                            result["rule"] = rule
+                    elif rule is None:
+                        result = {"browser": browser, "source": "forced"}
+                    else:
+                        result = {"browser": browser, "source": "remembered", "rule": rule}
+                    outcomes[match] = result
+            if len(hosts) >= MAX_RESOLVE_HOSTS:
+                hosts.clear()
+            hosts[host] = result
+        yield url, result
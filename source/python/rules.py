@@ -0,0 +1,132 @@
+"""Host normalization and matching of domain rules for remembered sites.
+
+Rule keys (the keys of remembered.json) come in three forms:
+
+    example.com     exact host
+    *.example.com   any subdomain of example.com, but not example.com itself
+    .example.com    example.com and all of its subdomains
+
+Any form may carry a port (``example.com:8080``), in which case it only
+applies to that port. Hosts are normalized before matching: userinfo is
+dropped, the name is lowercased and IDNA-encoded, and default ports are
+stripped. The most specific rule wins: an exact match beats suffix rules,
+a longer suffix beats a shorter one, and a port-specific rule beats a
+port-agnostic one.
+
+Rules are looked up with a handful of dict (or SQLite primary key) probes
+per host, one per candidate key, so no index has to be built or loaded
+before the first lookup; see match_mapping().
+"""
+
+DEFAULT_PORTS = {'http': '80', 'https': '443', 'ftp': '21', 'ws': '80', 'wss': '443'}
+
+
+def _split_host_port(netloc):
+    hostport = netloc.rpartition('@')[2].strip()
+    if hostport.startswith('['):
+        end = hostport.find(']')
+        if end != -1:
+            host, rest = hostport[:end + 1], hostport[end + 1:]
+            return host, rest[1:] if rest.startswith(':') else ''
+    host, _, port = hostport.partition(':')
+    return host, port
+
+
+def _idna_encode(host):
+    """ASCII form of an internationalized host name.
+
+    Uses UTS #46 / IDNA2008 processing, so 'straße.de' stays a different
+    domain from 'strasse.de' (Python's own 'idna' codec is IDNA2003 and
+    maps one to the other). The idna package is used when installed;
+    otherwise non-ASCII labels are only NFC-normalized and punycoded.
+    """
+    try:
+        import idna
+    except ImportError:
+        pass
+    else:
+        try:
+            return idna.encode(host, uts46=True).decode('ascii')
+        except UnicodeError:
+            pass
+    import unicodedata
+    labels = []
+    for label in unicodedata.normalize('NFC', host).split('.'):
+        if not label.isascii():
+            try:
+                label = 'xn--' + label.encode('punycode').decode('ascii')
+            except UnicodeError:
+                return host
+        labels.append(label)
+    return '.'.join(labels)
+
+
+def _normalize_name(host):
+    host = host.rstrip('.').lower()
+    if not host.isascii():
+        host = _idna_encode(host)
+    return host
+
+
+def normalize_host(netloc, scheme=None):
+    """Normalize a URL netloc to a rule key: 'host' or 'host:port'.
+
+    Without a scheme, ports 80 and 443 are treated as default ports.
+    """
+    host, port = _split_host_port(netloc)
+    host = _normalize_name(host)
+    if port:
+        port = port.lstrip('0') or '0'
+        if scheme:
+            if DEFAULT_PORTS.get(scheme.lower()) == port:
+                port = ''
+        elif port in ('80', '443'):
+            port = ''
+    return f"{host}:{port}" if port else host
+
+
+def normalize_rule(rule):
+    """Normalize a rule key as typed by the user, keeping its '*.'/'.' prefix."""
+    rule = rule.strip()
+    for prefix in ('*.', '.'):
+        if rule.startswith(prefix):
+            return prefix + normalize_host(rule[len(prefix):])
+    return normalize_host(rule)
+
+
+def candidate_keys(host_key):
+    """Yield the rule keys that could match host_key, most specific first.
+
+    The order implements the precedence described in the module
+    docstring, so the first key found in a mapping of normalized rules is
+    the one that applies; there are O(number of labels) of them.
+    """
+    host, sep, port = host_key.rpartition(':')
+    if not sep or ']' in port:
+        host, port = host_key, ''
+    yield host_key
+    if port:
+        yield host
+        yield f".{host}:{port}"
+    yield f".{host}"
+    labels = host.split('.')
+    for i in range(1, len(labels)):
+        suffix = '.'.join(labels[i:])
+        for prefix in ('*.', '.'):
+            if port:
+                yield f"{prefix}{suffix}:{port}"
+            yield prefix + suffix
+
+
+def match_mapping(mapping, host_key):
+    """Return (rule key, value) of the most specific rule in mapping, or None.
+
+    mapping is a dict (or anything with a dict-like get()) whose keys are
+    normalized with normalize_rule(), as RememberedStore keeps them; keys
+    in any other form (e.g. 'GitHub.com') are never matched.
+    """
+    for key in candidate_keys(host_key):
+        value = mapping.get(key)
+        if value is not None:
+            return key, value
+    return None
@@ -0,0 +1,132 @@
+"""Streaming import and export of remembered rules as JSON Lines or CSV.
+
+JSON Lines files hold one {"domain": ..., "browser": ...} object per
+line; CSV files have a domain,browser header. Neither is loaded into
+memory as a whole: rows are parsed lazily and applied by
+store.RememberedStore.merge() in one transaction.
+"""
+
+import csv
+import json
+import sys
+import time
+
+from rules import normalize_rule
+
+FORMATS = ('jsonl', 'csv')
+CSV_HEADER = ('domain', 'browser')
+
+
+def guess_format(path):
+    """Return 'csv' for *.csv files and 'jsonl' otherwise (also for '-')."""
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def _open(path, mode):
+    if path == '-':
+        return sys.stdin if 'r' in mode else sys.stdout
+    # newline='' lets the csv module handle line endings itself
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+def _raw_rows(f, fmt):
+    if fmt == 'csv':
+        for row in csv.reader(f):
+            if not row or tuple(c.strip().lower() for c in row[:2]) == CSV_HEADER:
+                continue
+            yield (row[0], row[1]) if len(row) >= 2 else None
+        return
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            obj = json.loads(line)
+            yield obj["domain"], obj["browser"]
+        except (ValueError, KeyError, TypeError):
+            yield None
+
+
+class RuleReader:
+    """Iterate over normalized (domain, browser) rows of an open file.
+
+    Malformed rows, empty domains and empty browser names are skipped
+    and counted in invalid; blank lines and CSV headers are ignored.
+    """
+
+    def __init__(self, f, fmt):
+        self._rows = _raw_rows(f, fmt)
+        self.invalid = 0
+
+    def __iter__(self):
+        for row in self._rows:
+            if row is None or not isinstance(row[0], str) or not isinstance(row[1], str):
+                self.invalid += 1
+                continue
+            domain = normalize_rule(row[0])
+            browser = row[1].strip()
+            if not domain or not browser:
+                self.invalid += 1
+                continue
+            yield domain, browser
+
+
+def import_rules(store, path, strategy, fmt=None):
+    """Merge the rules in path ('-' for stdin) into store; return counts.
+
+    The counts are those of RememberedStore.merge() plus "invalid" rows
+    and the elapsed "seconds". A file without valid rows or with invalid
+    ones raises ValueError and leaves the store unchanged, so that e.g. a
+    malformed file never wipes the rules with --merge replace.
+    """
+    fmt = fmt or guess_format(path)
+    start = time.perf_counter()
+    f = _open(path, 'r')
+    try:
+        reader = RuleReader(f, fmt)
+
+        def validate(counts):
+            if reader.invalid:
+                raise ValueError(f"{reader.invalid} invalid rows, nothing imported")
+            if not counts["read"]:
+                raise ValueError("no rules found, nothing imported")
+
+        counts = store.merge(reader, strategy, validate)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    counts["invalid"] = reader.invalid
+    counts["seconds"] = time.perf_counter() - start
+    return counts
+
+
+def export_rules(store, path, fmt=None):
+    """Write all rules of store to path ('-' for stdout); return counts."""
+    fmt = fmt or guess_format(path)
+    start = time.perf_counter()
+    count = 0
+    f = _open(path, 'w')
+    try:
+        if fmt == 'csv':
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(CSV_HEADER)
+            for row in store.iter_items():
+                writer.writerow(row)
+                count += 1
+        else:
+            for domain, browser in store.iter_items():
+                f.write(json.dumps({"domain": domain, "browser": browser}) + '\n')
+                count += 1
+        f.flush()
+    finally:
+        if f is not sys.stdout:
+            f.close()
+    return {"written": count, "seconds": time.perf_counter() - start}
+
+
+def format_report(action, path, counts, total):
+    """One-line summary with counts and throughput, e.g. for stderr."""
+    seconds = counts["seconds"]
+    rate = total / seconds if seconds > 0 else 0
+    details = ', '.join(f"{value} {key}" for key, value in counts.items() if key != 'seconds')
+    return f"{action} {path}: {details} in {seconds:.2f} s ({rate:,.0f} rules/s)"
@@ -0,0 +1,421 @@
+"""Selector and settings windows (GTK), imported only when a window is needed."""
+
+import os
+import time
+
+import gi
+
+gi.require_version('Gtk', '4.0')
+from gi.repository import Gtk, Gdk, Gio, GLib
+
+import config
+import icon_cache
+import metrics
+import timings
+from browser_scan import get_browsers
+from launcher import launch_urls
+from remote import APP_ID
+from routing import find_browser, url_domain
+
+DEFAULT_IDLE_TIMEOUT = 600  # seconds a --daemon instance stays resident while unused
+
+
+def build_css(appearance):
+    return f"""
+    window {{
+        background-color: @theme_bg_color;
+        border-radius: {appearance["border_radius"]}px;
+    }}
+    .browser-btn {{
+        min-width: 80px;
+        min-height: 36px;
+    }}
+    .url-label {{
+        font-size: 11px;
+        opacity: 0.7;
+    }}
+    """
+
+
+class SelectorWindow(Gtk.ApplicationWindow):
+    """Browser chooser. Built once per browser list/config, reusable across URLs.
+
+    The chooser holds a queue of URLs; links clicked while it is open are
+    appended with add_urls(). When the queue spans several domains a
+    dropdown picks whether a browser button opens the whole queue or only
+    one domain's links; the window stays open until the queue is empty.
+    With persistent=True closing only hides the window so a resident
+    instance can show it again via set_urls() and present().
+    """
+
+    def __init__(self, application, browser_list, cfg, persistent=False, on_settings_saved=None):
+        super().__init__(application=application, title="Browser Selector")
+        self.set_icon_name("applications-internet")
+        self.set_decorated(False)
+        self.set_resizable(False)
+        self.set_default_size(-1, -1)
+
+        self.urls = []
+        self.browser_list = browser_list
+        self.on_settings_saved = on_settings_saved
+        appearance = cfg["appearance"]
+
+        # Find default browser for highlighting (no auto-launch)
+        self.default_browser = find_browser(browser_list, cfg["default_browser"])
+
+        main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        main_box.set_margin_top(20)
+        main_box.set_margin_bottom(20)
+        main_box.set_margin_start(20)
+        main_box.set_margin_end(20)
+
+        # Gear button (top-right)
+        header_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
+        header_box.set_halign(Gtk.Align.END)
+        gear_btn = Gtk.Button()
+        gear_btn.set_icon_name("emblem-system")
+        gear_btn.set_tooltip_text("Settings")
+        gear_btn.add_css_class("flat")
+        gear_btn.connect('clicked', lambda _: self._open_settings())
+        header_box.append(gear_btn)
+        main_box.append(header_box)
+
+        # Show the URL being opened
+        self._url_label = Gtk.Label()
+        self._url_label.set_ellipsize(3)  # PANGO_ELLIPSIZE_END
+        self._url_label.add_css_class("url-label")
+        self._url_label.set_selectable(True)
+        main_box.append(self._url_label)
+
+        # Scope of a pick when the queue spans several domains
+        self._groups = []
+        self._scope = Gtk.DropDown()
+        self._scope.set_halign(Gtk.Align.CENTER)
+        main_box.append(self._scope)
+
+        # Browser buttons grid
+        columns = appearance["grid_columns"]
+        grid = Gtk.Grid()
+        grid.set_column_spacing(15)
+        grid.set_row_spacing(15)
+        grid.set_halign(Gtk.Align.CENTER)
+
+        # Icons start empty (at their final size, so nothing moves) and are
+        # filled in by _on_icons_loaded once decoded off the main loop
+        self._icons = {}
+        for i, browser in enumerate(browser_list):
+            vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
+            vbox.set_halign(Gtk.Align.CENTER)
+
+            icon = self._icons[browser["name"]] = Gtk.Image()
+            icon.set_pixel_size(appearance["icon_size"])
+            vbox.append(icon)
+
+            btn = Gtk.Button(label=browser["name"])
+            btn.add_css_class("browser-btn")
+            if self.default_browser and browser["name"] == self.default_browser["name"]:
+                btn.add_css_class("suggested-action")
+            btn.connect('clicked', lambda _, b=browser: self._on_button_clicked(b))
+            vbox.append(btn)
+            grid.attach(vbox, i % columns, i // columns, 1, 1)
+
+        if not browser_list:
+            no_browsers = Gtk.Label(label="No browsers found on this system.")
+            grid.attach(no_browsers, 0, 0, columns, 1)
+
+        main_box.append(grid)
+
+        self._remember_checkbox = Gtk.CheckButton(label="Remember for this site")
+        main_box.append(self._remember_checkbox)
+
+        self.set_child(main_box)
+
+        # Keyboard shortcuts: Enter = launch default, Escape = close
+        # CAPTURE phase so window intercepts before focused child widgets
+        key_ctrl = Gtk.EventControllerKey()
+        key_ctrl.set_propagation_phase(Gtk.PropagationPhase.CAPTURE)
+        key_ctrl.connect('key-pressed', self._on_key_pressed)
+        self.add_controller(key_ctrl)
+
+        if persistent:
+            self.connect('close-request', self._on_close_request)
+
+        self.set_urls([])
+
+        self._destroyed = False
+        self.connect('destroy', self._on_destroy)
+        self.connect('realize', self._on_realize)
+        icon_cache.load_in_background(browser_list, appearance["icon_size"], self._on_icons_loaded)
+
+    def _on_destroy(self, _win):
+        self._destroyed = True
+
+    def _on_icons_loaded(self, textures):
+        if not self._destroyed:
+            for browser in self.browser_list:
+                icon = self._icons[browser["name"]]
+                texture = textures.get(browser["name"])
+                if texture is not None:
+                    icon.set_from_paintable(texture)
+                elif os.path.isabs(browser["icon"]):
+                    icon.set_from_file(browser["icon"])
+                else:
+                    icon.set_from_icon_name(browser["icon"])
+            timings.since_start('icons_loaded')
+        return GLib.SOURCE_REMOVE
+
+    def _on_realize(self, _win):
+        clock = self.get_frame_clock()
+        if clock is not None:
+            self._paint_handler = clock.connect('after-paint', self._on_first_paint)
+
+    def _on_first_paint(self, clock):
+        clock.disconnect(self._paint_handler)
+        timings.since_start('first_frame')
+
+    def set_urls(self, urls):
+        """Point the chooser at new URLs without rebuilding any widgets."""
+        self.urls = []
+        self._remember_checkbox.set_active(True)
+        self.add_urls(urls)
+
+    def add_urls(self, urls):
+        """Append URLs to the queue, skipping ones already queued."""
+        queued = set(self.urls)
+        for url in urls:
+            if url not in queued:
+                queued.add(url)
+                self.urls.append(url)
+        self._update_queue()
+
+    def _update_queue(self):
+        if len(self.urls) > 1:
+            self._url_label.set_label(f"{self.urls[0]}  (+{len(self.urls) - 1} more)")
+            self._url_label.set_tooltip_text("\n".join(self.urls))
+            self._remember_checkbox.set_label("Remember for these sites")
+        else:
+            self._url_label.set_label(self.urls[0] if self.urls else "")
+            self._url_label.set_tooltip_text(None)
+            self._remember_checkbox.set_label("Remember for this site")
+        self._url_label.set_visible(bool(self.urls))
+        self._remember_checkbox.set_visible(bool(self.urls))
+
+        # Group by domain, in order of first appearance
+        groups = {}
+        for url in self.urls:
+            groups.setdefault(url_domain(url), []).append(url)
+        self._groups = [(None, self.urls)] + list(groups.items())
+        labels = [f"All {len(self.urls)} links"]
+        labels.extend(f"{domain or 'Other'} ({len(group)})" for domain, group in groups.items())
+        self._scope.set_model(Gtk.StringList.new(labels))
+        self._scope.set_selected(0)
+        self._scope.set_visible(len(groups) > 1)
+
+    def _selected_urls(self):
+        index = self._scope.get_selected()
+        if index >= len(self._groups):
+            index = 0
+        return self._groups[index][1] if self._groups else []
+
+    def _on_button_clicked(self, browser):
+        clicked = time.monotonic()
+        urls = list(self._selected_urls())
+        # Launch first; the remembered update is written behind on a worker thread
+        with timings.phase('launch'):
+            started = launch_urls(browser, urls)
+        timings.since_start('launched')
+        if started:
+            metrics.observe_latency('chooser', time.monotonic() - clicked)
+        # A resident instance may never exit cleanly; persist counters when idle
+        GLib.idle_add(lambda: metrics.flush() or GLib.SOURCE_REMOVE)
+        if self._remember_checkbox.get_active():
+            for url in urls:
+                domain = url_domain(url)
+                if domain:
+                    config.remember_later(domain, browser["name"])
+        launched = set(urls)
+        self.urls = [url for url in self.urls if url not in launched]
+        if self.urls:
+            self._update_queue()
+        else:
+            self.close()
+
+    def _on_key_pressed(self, _ctrl, keyval, _keycode, _state):
+        if keyval == Gdk.KEY_Return and self.default_browser:
+            self._on_button_clicked(self.default_browser)
+            return True
+        if keyval == Gdk.KEY_Escape:
+            self.close()
+            return True
+        return False
+
+    def _on_close_request(self, _win):
+        self.set_visible(False)
+        return True
+
+    def _open_settings(self):
+        from settings import SettingsWindow
+        SettingsWindow(
+            browsers=self.browser_list,
+            on_save=self.on_settings_saved or (lambda c: None),
+            application=self.get_application(),
+        ).present()
+
+
+class SelectorApplication(Gtk.Application):
+    """Gtk.Application that shows the chooser for URLs passed on its command line.
+
+    Secondary invocations forward their command line to the primary
+    instance. In daemon mode the primary stays resident with the browser
+    list, config, CSS provider and a hidden window prepared in advance,
+    keeps them current through a watcher.ChangeWatcher, and exits after
+    idle_timeout seconds without requests.
+    """
+
+    def __init__(self, browser_list=None, cfg=None, use_cache=True,
+                 daemon=False, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        super().__init__(application_id=APP_ID, flags=Gio.ApplicationFlags.HANDLES_COMMAND_LINE)
+        self.browser_list = browser_list
+        self.cfg = cfg
+        self.use_cache = use_cache
+        self.daemon = daemon
+        self.idle_timeout = idle_timeout
+        self.window = None
+        self._css_provider = None
+        self._watcher = None
+        self._idle_source = 0
+
+    def do_startup(self):
+        Gtk.Application.do_startup(self)
+        if self.browser_list is None or self.cfg is None:
+            self.refresh(rescan=False)
+        else:
+            self._apply_css()
+        if self.daemon:
+            from watcher import ChangeWatcher
+            self._watcher = ChangeWatcher()
+            self._watcher.subscribe(self._on_watched_change)
+            self.hold()
+            self.window = self._build_window()
+            self._reset_idle_timer()
+
+    def do_shutdown(self):
+        if self._watcher is not None:
+            self._watcher.close()
+            self._watcher = None
+        config.flush_remembered()
+        Gtk.Application.do_shutdown(self)
+
+    def do_command_line(self, command_line):
+        args = command_line.get_arguments()[1:]
+        if '--reload' in args:
+            self.refresh(rescan=True)
+
+        urls = [a for a in args if not a.startswith('--')]
+        if urls or not ('--daemon' in args or '--reload' in args):
+            self.show_urls(urls)
+        if self.daemon:
+            self._reset_idle_timer()
+        return 0
+
+    def show_urls(self, urls):
+        """Show the chooser for urls, queueing them if it is already open."""
+        if self.window is None:
+            self.window = self._build_window()
+        if self.window.get_visible():
+            self.window.add_urls(urls)
+        else:
+            self.window.set_urls(urls)
+        with timings.phase('present'):
+            self.window.present()
+        timings.since_start('window_presented')
+
+    def refresh(self, rescan=False):
+        """Reload browsers and config, and rebuild the (hidden) window."""
+        self.cfg = config.load_config()
+        self.browser_list = config.filter_browsers(get_browsers(use_cache=self.use_cache and not rescan))
+        self._apply_css()
+        self._rebuild_window()
+
+    def _on_watched_change(self, kind, data):
+        if kind == 'browsers':
+            self.browser_list = config.filter_browsers(data)
+        elif kind == 'config':
+            # Also covers system policy changes, e.g. allowed_browsers
+            self.cfg = config.load_config()
+            self.browser_list = config.filter_browsers(self._watcher.browsers())
+            self._apply_css()
+        else:
+            return
+        self._rebuild_window()
+
+    def _rebuild_window(self):
+        if self.window is not None:
+            visible = self.window.get_visible()
+            urls = self.window.urls
+            self.window.destroy()
+            self.window = self._build_window()
+            if visible:
+                self.show_urls(urls)
+
+    def _build_window(self):
+        with timings.phase('build_window'):
+            win = SelectorWindow(
+                self, self.browser_list, self.cfg,
+                persistent=self.daemon,
+                # A daemon's watcher already picks up the saved config
+                on_settings_saved=None if self.daemon else (lambda _cfg: self.refresh(rescan=False)),
+            )
+        win.connect('destroy', self._on_window_destroyed)
+        return win
+
+    def _on_window_destroyed(self, win):
+        if self.window is win:
+            self.window = None
+
+    def _apply_css(self):
+        if self._css_provider is None:
+            self._css_provider = Gtk.CssProvider()
+            Gtk.StyleContext.add_provider_for_display(
+                Gdk.Display.get_default(), self._css_provider,
+                Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION,
+            )
+        self._css_provider.load_from_string(build_css(self.cfg["appearance"]))
+
+    def _reset_idle_timer(self):
+        if self._idle_source:
+            GLib.source_remove(self._idle_source)
+            self._idle_source = 0
+        if self.idle_timeout > 0:
+            self._idle_source = GLib.timeout_add_seconds(self.idle_timeout, self._on_idle_timeout)
+
+    def _on_idle_timeout(self):
+        # The chooser or a settings window opened from it (maybe with unsaved edits)
+        if any(window.get_visible() for window in self.get_windows()):
+            return GLib.SOURCE_CONTINUE
+        self._idle_source = 0
+        self.quit()
+        return GLib.SOURCE_REMOVE
+
+
+def on_settings_activate(app, use_cache=True):
+    """Open settings window directly (--settings mode)."""
+    from settings import SettingsWindow
+    browsers = config.filter_browsers(get_browsers(use_cache=use_cache))
+    SettingsWindow(browsers=browsers, application=app).present()
+
+
+def run_selector(urls, browser_list, cfg):
+    app = SelectorApplication(browser_list=browser_list, cfg=cfg)
+    return app.run(['browserselector'] + list(urls))
+
+
+def run_daemon(use_cache=True, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+    app = SelectorApplication(use_cache=use_cache, daemon=True, idle_timeout=idle_timeout)
+    return app.run(['browserselector', '--daemon'])
+
+
+def run_settings(use_cache=True):
+    app = Gtk.Application(application_id=APP_ID + '.settings')
+    app.connect('activate', lambda a: on_settings_activate(a, use_cache))
+    app.run(None)
@@ -2,9 +2,23 @@
 
 import gi
 gi.require_version('Gtk', '4.0')
-from gi.repository import Gtk
+from gi.repository import Gio, GObject, Gtk
 
 import config
+import icon_cache
+from rules import normalize_rule
+from site_index import SiteIndex
+
+# Notebook page numbers
+REMEMBERED_TAB, APPEARANCE_TAB, DEFAULT_BROWSER_TAB = range(3)
+
+
+class RememberedItem(GObject.Object):
+    """One remembered site in the settings list model."""
+
+    domain = GObject.Property(type=str, default="")
+    browser = GObject.Property(type=str, default="")
+    editing = GObject.Property(type=bool, default=False)
 
 
 class SettingsWindow(Gtk.Window):
@@ -20,7 +34,7 @@ class SettingsWindow(Gtk.Window):
         self.browsers = browsers or []
         self.on_save = on_save
         self.cfg = config.load_config()
-        self.remembered = config.load_remembered()
+        self.remembered = None  # loaded with the Remembered Sites tab
 
         outer = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8)
         outer.set_margin_top(12)
@@ -28,12 +42,19 @@ class SettingsWindow(Gtk.Window):
         outer.set_margin_start(12)
         outer.set_margin_end(12)
 
-        # Notebook with 3 tabs
+        # Notebook with 3 tabs, each built the first time it is selected
         self.notebook = Gtk.Notebook()
         self.notebook.set_vexpand(True)
-        self.notebook.append_page(self._build_remembered_tab(), Gtk.Label(label="Remembered Sites"))
-        self.notebook.append_page(self._build_appearance_tab(), Gtk.Label(label="Appearance"))
-        self.notebook.append_page(self._build_default_browser_tab(), Gtk.Label(label="Default Browser"))
+        self._tab_builders = [
+            ("Remembered Sites", self._build_remembered_tab),
+            ("Appearance", self._build_appearance_tab),
+            ("Default Browser", self._build_default_browser_tab),
+        ]
+        self._built_tabs = set()
+        for title, _builder in self._tab_builders:
+            self.notebook.append_page(Gtk.Box(), Gtk.Label(label=title))
+        self.notebook.connect('switch-page', self._on_switch_page)
+        self._ensure_tab(self.notebook.get_current_page())
         outer.append(self.notebook)
 
         # Footer buttons
@@ -53,21 +74,67 @@ class SettingsWindow(Gtk.Window):
         outer.append(footer)
         self.set_child(outer)
 
+    def _on_switch_page(self, _notebook, _page, page_num):
+        self._ensure_tab(page_num)
+
+    def _ensure_tab(self, page_num):
+        """Build the contents of tab page_num into its placeholder, once."""
+        if page_num < 0 or page_num in self._built_tabs:
+            return
+        self._built_tabs.add(page_num)
+        content = self._tab_builders[page_num][1]()
+        content.set_hexpand(True)
+        content.set_vexpand(True)
+        self.notebook.get_nth_page(page_num).append(content)
+
     def _build_remembered_tab(self):
+        self.remembered = config.load_remembered()
+        self._loaded_remembered = dict(self.remembered)  # saved as a diff against this
+
         box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8)
         box.set_margin_top(8)
         box.set_margin_start(8)
         box.set_margin_end(8)
 
+        self._browser_names = [b["name"] for b in self.browsers]
+        self._browser_index = {n: i for i, n in enumerate(self._browser_names)}
+        self._browser_model = Gtk.StringList.new(self._browser_names)
+
+        # Filter by domain substring, .suffix or browser name
+        self._search_entry = Gtk.SearchEntry()
+        self._search_entry.set_placeholder_text("Search domains or browsers (.example.com for subdomains)")
+        self._search_entry.connect('search-changed', lambda _: self._apply_filter())
+        box.append(self._search_entry)
+
+        # One item per remembered site; the ListView only creates widgets
+        # for visible rows and recycles them while scrolling. The store
+        # holds the filtered subset of self._items.
+        self._index = SiteIndex(self.remembered)
+        self._items = {d: RememberedItem(domain=d, browser=b) for d, b in self.remembered.items()}
+        self._remembered_store = Gio.ListStore(item_type=RememberedItem)
+        self._remembered_store.splice(0, 0, list(self._items.values()))
+
+        factory = Gtk.SignalListItemFactory()
+        factory.connect('setup', self._on_row_setup)
+        factory.connect('bind', self._on_row_bind)
+        list_view = Gtk.ListView(model=Gtk.NoSelection(model=self._remembered_store), factory=factory)
+
         scroll = Gtk.ScrolledWindow()
         scroll.set_min_content_height(200)
         scroll.set_vexpand(True)
-        self._remembered_listbox = Gtk.ListBox()
-        self._remembered_listbox.set_selection_mode(Gtk.SelectionMode.NONE)
-        scroll.set_child(self._remembered_listbox)
-        box.append(scroll)
+        scroll.set_child(list_view)
+
+        self._empty_label = empty = Gtk.Label()
+        empty.set_valign(Gtk.Align.START)
+        empty.set_margin_top(20)
+
+        self._remembered_stack = Gtk.Stack()
+        self._remembered_stack.add_named(scroll, "list")
+        self._remembered_stack.add_named(empty, "empty")
+        box.append(self._remembered_stack)
+        self._update_empty_state()
 
-        self._populate_remembered_list()
+        box.append(self._build_add_row())
 
         btn_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
         btn_box.set_halign(Gtk.Align.START)
@@ -81,121 +148,169 @@ class SettingsWindow(Gtk.Window):
 
         return box
 
-    def _populate_remembered_list(self, editing_domain=None):
-        # Remove existing rows
-        while True:
-            row = self._remembered_listbox.get_row_at_index(0)
-            if row is None:
-                break
-            self._remembered_listbox.remove(row)
-
-        if not self.remembered:
-            empty = Gtk.Label(label="No remembered sites.")
-            empty.set_margin_top(20)
-            self._remembered_listbox.append(empty)
-            return
-
-        browser_names = [b["name"] for b in self.browsers]
-
-        for domain, browser in self.remembered.items():
-            row_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
-            row_box.set_margin_top(4)
-            row_box.set_margin_bottom(4)
-            row_box.set_margin_start(4)
-            row_box.set_margin_end(4)
-
-            if editing_domain == domain:
-                # Edit mode: domain label + browser dropdown + OK/Cancel
-                row_box.append(Gtk.Label(label=f"{domain}  →"))
-                dd = Gtk.DropDown(model=Gtk.StringList.new(browser_names))
-                for i, n in enumerate(browser_names):
-                    if n == browser:
-                        dd.set_selected(i)
-                        break
-                dd.set_hexpand(True)
-                row_box.append(dd)
-                ok_btn = Gtk.Button(label="OK")
-                ok_btn.add_css_class("suggested-action")
-                def on_ok(_, dd=dd, ns=browser_names, d=domain):
-                    idx = dd.get_selected()
-                    if 0 <= idx < len(ns):
-                        self.remembered[d] = ns[idx]
-                    self._populate_remembered_list()
-                ok_btn.connect('clicked', on_ok)
-                row_box.append(ok_btn)
-                cancel_btn = Gtk.Button(label="Cancel")
-                cancel_btn.connect('clicked', lambda _: self._populate_remembered_list())
-                row_box.append(cancel_btn)
-            else:
-                # Normal mode: label + Edit + Delete
-                label = Gtk.Label(label=f"{domain}  →  {browser}")
-                label.set_hexpand(True)
-                label.set_halign(Gtk.Align.START)
-                row_box.append(label)
-
-                edit_btn = Gtk.Button(label="Edit")
-                edit_btn.connect('clicked', lambda _, d=domain: self._on_edit_remembered(d))
-                row_box.append(edit_btn)
-
-                del_btn = Gtk.Button(label="Delete")
-                del_btn.add_css_class("destructive-action")
-                del_btn.connect('clicked', lambda _, d=domain: self._on_delete_remembered(d))
-                row_box.append(del_btn)
-
-            self._remembered_listbox.append(row_box)
+    def _update_empty_state(self):
+        empty = self._remembered_store.get_n_items() == 0
+        self._empty_label.set_label("No matching sites." if self._items else "No remembered sites.")
+        self._remembered_stack.set_visible_child_name("empty" if empty else "list")
 
-    def _on_delete_remembered(self, domain):
-        if domain in self.remembered:
-            del self.remembered[domain]
-        self._populate_remembered_list()
+    def _apply_filter(self):
+        """Show the items matching the search entry, replacing the store contents in one splice."""
+        domains = self._index.search(self._search_entry.get_text())
+        if domains is None:
+            items = list(self._items.values())
+        else:
+            items = [self._items[d] for d in domains]
+        self._remembered_store.splice(0, self._remembered_store.get_n_items(), items)
+        self._update_empty_state()
+
+    def _on_row_setup(self, _factory, list_item):
+        """Create the widgets of one (recyclable) row: a normal and an edit mode."""
+        stack = Gtk.Stack()
+
+        # Normal mode: label + Edit + Delete
+        view_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        label = Gtk.Label()
+        label.set_hexpand(True)
+        label.set_halign(Gtk.Align.START)
+        label.set_ellipsize(3)  # PANGO_ELLIPSIZE_END
+        view_box.append(label)
+        edit_btn = Gtk.Button(label="Edit")
+        edit_btn.connect('clicked', lambda _: self._on_edit_remembered(list_item.get_item()))
+        view_box.append(edit_btn)
+        del_btn = Gtk.Button(label="Delete")
+        del_btn.add_css_class("destructive-action")
+        del_btn.connect('clicked', lambda _: self._on_delete_remembered(list_item.get_item()))
+        view_box.append(del_btn)
+        stack.add_named(view_box, "view")
+
+        # Edit mode: domain label + browser dropdown + OK/Cancel
+        edit_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        edit_label = Gtk.Label()
+        edit_box.append(edit_label)
+        dd = Gtk.DropDown(model=self._browser_model)
+        dd.set_hexpand(True)
+        edit_box.append(dd)
+        ok_btn = Gtk.Button(label="OK")
+        ok_btn.add_css_class("suggested-action")
+        ok_btn.connect('clicked', lambda _: self._on_edit_done(list_item.get_item(), dd.get_selected()))
+        edit_box.append(ok_btn)
+        cancel_btn = Gtk.Button(label="Cancel")
+        cancel_btn.connect('clicked', lambda _: self._on_edit_done(list_item.get_item(), None))
+        edit_box.append(cancel_btn)
+        stack.add_named(edit_box, "edit")
+
+        stack.set_margin_top(4)
+        stack.set_margin_bottom(4)
+        stack.set_margin_start(4)
+        stack.set_margin_end(4)
+        list_item.set_child(stack)
+        list_item._widgets = (stack, label, edit_label, dd)
+
+    def _on_row_bind(self, _factory, list_item):
+        item = list_item.get_item()
+        stack, label, edit_label, dd = list_item._widgets
+        label.set_label(f"{item.domain}  →  {item.browser}")
+        edit_label.set_label(f"{item.domain}  →")
+        if item.editing:
+            dd.set_selected(self._browser_index.get(item.browser, Gtk.INVALID_LIST_POSITION))
+        stack.set_visible_child_name("edit" if item.editing else "view")
+
+    def _replace_item(self, item, new_item):
+        """Swap one model item; only that row is re-bound."""
+        self._items[new_item.domain] = new_item
+        found, pos = self._remembered_store.find(item)
+        if found:
+            self._remembered_store.splice(pos, 1, [new_item])
+
+    def _on_edit_remembered(self, item):
+        if item is not None:
+            self._replace_item(item, RememberedItem(domain=item.domain, browser=item.browser, editing=True))
+
+    def _on_edit_done(self, item, selected):
+        if item is None:
+            return
+        browser = item.browser
+        if selected is not None and 0 <= selected < len(self._browser_names):
+            browser = self._browser_names[selected]
+            self.remembered[item.domain] = browser
+            self._index.add(item.domain, browser)
+        self._replace_item(item, RememberedItem(domain=item.domain, browser=browser))
+
+    def _on_delete_remembered(self, item):
+        if item is None:
+            return
+        self.remembered.pop(item.domain, None)
+        self._index.remove(item.domain)
+        self._items.pop(item.domain, None)
+        found, pos = self._remembered_store.find(item)
+        if found:
+            self._remembered_store.remove(pos)
+        self._update_empty_state()
 
     def _on_clear_all(self, _btn):
         self.remembered.clear()
-        self._populate_remembered_list()
+        self._index.clear()
+        self._items.clear()
+        self._remembered_store.remove_all()
+        self._update_empty_state()
 
-    def _on_edit_remembered(self, domain):
-        self._populate_remembered_list(editing_domain=domain)
-
-    def _on_add_remembered(self, _btn):
-        """Show an inline add row at the bottom of the remembered list."""
-        browser_names = [b["name"] for b in self.browsers]
+    def _build_add_row(self):
+        """Inline add row below the list, hidden until "Add" is clicked."""
         row_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
         row_box.set_margin_top(4)
         row_box.set_margin_bottom(4)
         row_box.set_margin_start(4)
         row_box.set_margin_end(4)
 
-        entry = Gtk.Entry()
-        entry.set_placeholder_text("domain.com")
-        entry.set_hexpand(True)
-        row_box.append(entry)
+        self._add_entry = Gtk.Entry()
+        self._add_entry.set_hexpand(True)
+        row_box.append(self._add_entry)
 
-        dd = Gtk.DropDown(model=Gtk.StringList.new(browser_names))
-        row_box.append(dd)
+        self._add_dropdown = Gtk.DropDown(model=self._browser_model)
+        row_box.append(self._add_dropdown)
 
         add_btn = Gtk.Button(label="Add")
         add_btn.add_css_class("suggested-action")
-        def on_add(_):
-            domain = entry.get_text().strip()
-            if not domain:
-                return
-            if domain in self.remembered:
-                entry.add_css_class("error")
-                entry.set_text("")
-                entry.set_placeholder_text("Already exists!")
-                return
-            idx = dd.get_selected()
-            if 0 <= idx < len(browser_names):
-                self.remembered[domain] = browser_names[idx]
-            self._populate_remembered_list()
-        add_btn.connect('clicked', on_add)
+        add_btn.connect('clicked', self._on_add_confirmed)
         row_box.append(add_btn)
 
         cancel_btn = Gtk.Button(label="Cancel")
-        cancel_btn.connect('clicked', lambda _: self._populate_remembered_list())
+        cancel_btn.connect('clicked', lambda _: self._add_revealer.set_reveal_child(False))
         row_box.append(cancel_btn)
 
-        self._remembered_listbox.append(row_box)
+        self._add_revealer = Gtk.Revealer()
+        self._add_revealer.set_child(row_box)
+        return self._add_revealer
+
+    def _on_add_remembered(self, _btn):
+        """Show the inline add row below the remembered list."""
+        self._add_entry.set_text("")
+        self._add_entry.remove_css_class("error")
+        self._add_entry.set_placeholder_text("domain.com, *.domain.com or .domain.com")
+        self._add_revealer.set_reveal_child(True)
+        self._add_entry.grab_focus()
+
+    def _on_add_confirmed(self, _btn):
+        domain = normalize_rule(self._add_entry.get_text())
+        if not domain:
+            return
+        if domain in self.remembered:
+            self._add_entry.add_css_class("error")
+            self._add_entry.set_text("")
+            self._add_entry.set_placeholder_text("Already exists!")
+            return
+        idx = self._add_dropdown.get_selected()
+        if 0 <= idx < len(self._browser_names):
+            browser = self._browser_names[idx]
+            self.remembered[domain] = browser
+            self._index.add(domain, browser)
+            item = self._items[domain] = RememberedItem(domain=domain, browser=browser)
+            if self._search_entry.get_text().strip():
+                self._apply_filter()
+            else:
+                self._remembered_store.append(item)
+                self._update_empty_state()
+        self._add_revealer.set_reveal_child(False)
 
     def _build_appearance_tab(self):
         grid = Gtk.Grid()
@@ -257,20 +372,51 @@ class SettingsWindow(Gtk.Window):
         return box
 
     def _on_save(self):
+        """Save what was changed in the opened tabs.
+
+        Only the differences to the values loaded when the window opened
+        are written, merged into the current files, so choices made in
+        other selector processes meanwhile are not overwritten.
+        """
+        old_icon_size = self.cfg["appearance"]["icon_size"]
+        changes = {}
+
         # Read appearance values
-        self.cfg["appearance"]["icon_size"] = int(self._icon_size_spin.get_value())
-        self.cfg["appearance"]["grid_columns"] = int(self._columns_spin.get_value())
-        self.cfg["appearance"]["border_radius"] = int(self._border_spin.get_value())
+        if APPEARANCE_TAB in self._built_tabs:
+            appearance = {
+                "icon_size": int(self._icon_size_spin.get_value()),
+                "grid_columns": int(self._columns_spin.get_value()),
+                "border_radius": int(self._border_spin.get_value()),
+            }
+            appearance = {k: v for k, v in appearance.items() if v != self.cfg["appearance"][k]}
+            if appearance:
+                changes["appearance"] = appearance
 
         # Read default browser
-        idx = self._default_dropdown.get_selected()
-        if idx == 0 or idx >= len(self.browsers) + 1:
-            self.cfg["default_browser"] = None
-        else:
-            self.cfg["default_browser"] = self.browsers[idx - 1]["name"]
-
-        config.save_config(self.cfg)
-        config.save_remembered(self.remembered)
+        if DEFAULT_BROWSER_TAB in self._built_tabs:
+            idx = self._default_dropdown.get_selected()
+            if idx == 0 or idx >= len(self.browsers) + 1:
+                default_browser = None
+            else:
+                default_browser = self.browsers[idx - 1]["name"]
+            if default_browser != self.cfg["default_browser"]:
+                changes["default_browser"] = default_browser
+
+        if changes:
+            config.update_config(changes)
+            self.cfg["appearance"].update(changes.get("appearance", {}))
+            if "default_browser" in changes:
+                self.cfg["default_browser"] = changes["default_browser"]
+
+        if self.remembered is not None:
+            original = self._loaded_remembered
+            config.update_remembered(
+                {d: b for d, b in self.remembered.items() if original.get(d) != b},
+                [d for d in original if d not in self.remembered],
+            )
+
+        if self.cfg["appearance"]["icon_size"] != old_icon_size:
+            icon_cache.rebuild_in_background(self.browsers, self.cfg["appearance"]["icon_size"])
 
         if self.on_save:
             self.on_save(self.cfg)
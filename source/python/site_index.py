@@ -0,0 +1,107 @@
+"""In-memory search index over remembered sites (no GTK)."""
+
+from bisect import bisect_left, insort
+
+from rules import normalize_host
+
+
+def _host_of(domain):
+    """Host name of a rule key, without wildcard prefix and port."""
+    host = domain.lstrip('*').lstrip('.')
+    if not host.endswith(']'):
+        name, sep, port = host.rpartition(':')
+        if sep and port.isdigit():
+            host = name
+    return host
+
+
+def _reversed_key(domain):
+    return _host_of(domain)[::-1]
+
+
+class SiteIndex:
+    """Search remembered domain -> browser entries by substring, suffix or browser.
+
+    A query starting with '.' or '*.' is a suffix search: '.example.com'
+    finds example.com and every rule below it by bisecting a sorted list
+    of reversed host names. Any other query matches domains containing it
+    and, through a per-browser inverted index, all domains of browsers
+    whose name contains it. add() and remove() keep both indexes current.
+    """
+
+    def __init__(self, mapping=None):
+        mapping = mapping or {}
+        self._browsers = dict(mapping)
+        self._by_browser = {}
+        for domain, browser in self._browsers.items():
+            self._by_browser.setdefault(browser.lower(), set()).add(domain)
+        self._reversed = sorted((_reversed_key(d), d) for d in self._browsers)
+
+    def __len__(self):
+        return len(self._browsers)
+
+    def add(self, domain, browser):
+        """Add or reassign one entry."""
+        old = self._browsers.get(domain)
+        if old is not None:
+            self._discard_browser(domain, old)
+        else:
+            insort(self._reversed, (_reversed_key(domain), domain))
+        self._browsers[domain] = browser
+        self._by_browser.setdefault(browser.lower(), set()).add(domain)
+
+    def remove(self, domain):
+        browser = self._browsers.pop(domain, None)
+        if browser is None:
+            return
+        self._discard_browser(domain, browser)
+        key = (_reversed_key(domain), domain)
+        pos = bisect_left(self._reversed, key)
+        if pos < len(self._reversed) and self._reversed[pos] == key:
+            del self._reversed[pos]
+
+    def clear(self):
+        self._browsers.clear()
+        self._by_browser.clear()
+        self._reversed.clear()
+
+    def _discard_browser(self, domain, browser):
+        domains = self._by_browser.get(browser.lower())
+        if domains is not None:
+            domains.discard(domain)
+            if not domains:
+                del self._by_browser[browser.lower()]
+
+    def search(self, query):
+        """Return the matching domains as a list, or None when query is empty (all match).
+
+        Substring and browser matches keep insertion order; suffix matches
+        come grouped by host, parents before their subdomains.
+        """
+        query = query.strip().lower()
+        if not query:
+            return None
+        if query.startswith('.') or query.startswith('*.'):
+            return self.suffix(query)
+        by_browser = set()
+        for name, domains in self._by_browser.items():
+            if query in name:
+                by_browser |= domains
+        if by_browser:
+            return [d for d in self._browsers if query in d or d in by_browser]
+        return [d for d in self._browsers if query in d]
+
+    def suffix(self, suffix):
+        """Domains whose host is suffix or a subdomain of it."""
+        host = _host_of(suffix.strip().lower())
+        if not host:
+            return list(self._browsers)
+        rev = normalize_host(host)[::-1]
+        # Whole labels only: the host itself, then keys starting with
+        # 'moc.elpmaxe.' ('/' sorts right after '.'), never notexample.com
+        entries = self._reversed
+        matches = [domain for _key, domain in
+                   entries[bisect_left(entries, (rev,)):bisect_left(entries, (rev + '\0',))]]
+        matches.extend(domain for _key, domain in
+                       entries[bisect_left(entries, (rev + '.',)):bisect_left(entries, (rev + '/',))])
+        return matches
@@ -0,0 +1,224 @@
+"""SQLite storage backend for remembered domain rules.
+
+Single-key reads and writes touch only the affected row, so the cost of
+remembering one more site does not grow with the size of the rule set.
+SQLite's write-ahead log makes every write atomic and crash-safe.
+"""
+
+import json
+import os
+import sqlite3
+
+from rules import normalize_rule
+
+MERGE_STRATEGIES = ('keep-local', 'prefer-incoming', 'replace')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS remembered (
+    domain TEXT PRIMARY KEY,
+    browser TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class RememberedStore:
+    """domain -> browser name table in an SQLite database.
+
+    Domains are stored normalized with rules.normalize_rule(), so that
+    rules.match_mapping() can look rules up with plain get() calls; keys
+    written by older versions are normalized once when the database is
+    opened. On first use the contents of legacy_json (the old
+    remembered.json) are imported once; if it exists but cannot be read,
+    the import is retried on the next open.
+    """
+
+    def __init__(self, path, legacy_json=None):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        if legacy_json and not self._meta("json_imported"):
+            self._import_legacy(legacy_json)
+        if not self._meta("keys_normalized"):
+            self._normalize_keys()
+
+    def _meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _import_legacy(self, json_path):
+        try:
+            with open(json_path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            data = {}
+        except OSError:
+            return  # unreadable for now: leave json_imported unset so the next open retries
+        if not isinstance(data, dict):
+            data = {}
+        with self.transaction():
+            # Another process may have imported while we were reading
+            if self._meta("json_imported"):
+                return
+            rows = ((normalize_rule(str(d)), str(b)) for d, b in data.items() if b)
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO remembered (domain, browser) VALUES (?, ?)",
+                ((d, b) for d, b in rows if d),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('json_imported', ?)",
+                (json_path,),
+            )
+
+    def _normalize_keys(self):
+        with self.transaction():
+            if self._meta("keys_normalized"):
+                return
+            renamed = [(domain, normalize_rule(domain), browser)
+                       for domain, browser in self._conn.execute("SELECT domain, browser FROM remembered")
+                       if normalize_rule(domain) not in ('', domain)]
+            self._conn.executemany("DELETE FROM remembered WHERE domain = ?",
+                                   ((old,) for old, _new, _browser in renamed))
+            # A key that was already normal wins over the ones renamed to it
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO remembered (domain, browser) VALUES (?, ?)",
+                ((new, browser) for _old, new, browser in renamed),
+            )
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('keys_normalized', '1')")
+
+    def transaction(self):
+        """Context manager for a write transaction (BEGIN IMMEDIATE ... COMMIT)."""
+        return _Transaction(self._conn)
+
+    def get(self, domain, default=None):
+        row = self._conn.execute(
+            "SELECT browser FROM remembered WHERE domain = ?", (domain,)
+        ).fetchone()
+        return row[0] if row else default
+
+    def put(self, domain, browser):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO remembered (domain, browser) VALUES (?, ?)",
+            (normalize_rule(domain), browser),
+        )
+
+    def delete(self, domain):
+        self._conn.execute("DELETE FROM remembered WHERE domain = ?", (normalize_rule(domain),))
+
+    def items(self):
+        """Return all rules as a dict."""
+        return dict(self._conn.execute("SELECT domain, browser FROM remembered"))
+
+    def update(self, changes, deleted=()):
+        """Atomically put the rules in changes and delete the domains in deleted."""
+        with self.transaction():
+            self._conn.executemany("DELETE FROM remembered WHERE domain = ?",
+                                   ((normalize_rule(domain),) for domain in deleted))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO remembered (domain, browser) VALUES (?, ?)",
+                ((normalize_rule(domain), browser) for domain, browser in changes.items()),
+            )
+
+    def replace_all(self, mapping):
+        """Atomically replace the whole table with mapping."""
+        with self.transaction():
+            self._conn.execute("DELETE FROM remembered")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO remembered (domain, browser) VALUES (?, ?)",
+                ((normalize_rule(domain), browser) for domain, browser in mapping.items()),
+            )
+
+    def iter_items(self):
+        """Yield (domain, browser) rows sorted by domain, without loading them all."""
+        return self._conn.execute("SELECT domain, browser FROM remembered ORDER BY domain")
+
+    def merge(self, rows, strategy, validate=None):
+        """Apply (domain, browser) rows in one transaction; return counts.
+
+        rows may be any iterable of normalized rules (as yielded by
+        rules_io.RuleReader) and is consumed once; it is staged in a
+        temporary table (the last row for a domain wins) and merged with a
+        single statement. strategy is one of MERGE_STRATEGIES:
+        'keep-local' only adds domains that are not remembered yet,
+        'prefer-incoming' also overwrites local rules, and 'replace' makes
+        the table equal to the incoming rows.
+
+        validate, if given, is called with the counts of the staged rows
+        before the table is touched; an exception raised by it aborts the
+        merge and rolls the transaction back.
+        """
+        if strategy not in MERGE_STRATEGIES:
+            raise ValueError(f"unknown merge strategy: {strategy}")
+        conn = self._conn
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS incoming "
+                     "(domain TEXT PRIMARY KEY, browser TEXT NOT NULL) WITHOUT ROWID")
+        counts = {}
+        with self.transaction():
+            conn.execute("DELETE FROM temp.incoming")
+            counter = _Counter(rows)
+            conn.executemany("INSERT OR REPLACE INTO temp.incoming (domain, browser) VALUES (?, ?)",
+                             counter)
+            unique = conn.execute("SELECT COUNT(*) FROM temp.incoming").fetchone()[0]
+            counts["read"] = counter.count
+            counts["duplicates"] = counter.count - unique
+            counts["added"] = conn.execute(
+                "SELECT COUNT(*) FROM temp.incoming WHERE domain NOT IN (SELECT domain FROM remembered)"
+            ).fetchone()[0]
+            conflicts = conn.execute(
+                "SELECT COUNT(*) FROM temp.incoming AS i JOIN remembered AS r USING (domain) "
+                "WHERE r.browser != i.browser"
+            ).fetchone()[0]
+            counts["updated"] = 0 if strategy == 'keep-local' else conflicts
+            counts["kept"] = conflicts if strategy == 'keep-local' else 0
+            counts["removed"] = 0
+            if validate is not None:
+                validate(counts)
+            if strategy == 'replace':
+                counts["removed"] = conn.execute(
+                    "DELETE FROM remembered WHERE domain NOT IN (SELECT domain FROM temp.incoming)"
+                ).rowcount
+            verb = "INSERT OR IGNORE" if strategy == 'keep-local' else "INSERT OR REPLACE"
+            conn.execute(f"{verb} INTO remembered (domain, browser) SELECT domain, browser FROM temp.incoming")
+            conn.execute("DELETE FROM temp.incoming")
+        return counts
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM remembered").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+class _Counter:
+    """Iterate over rows while counting them."""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = next(self._rows)
+        self.count += 1
+        return row
+
+
+class _Transaction:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __enter__(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self._conn
+
+    def __exit__(self, exc_type, _exc, _tb):
+        self._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
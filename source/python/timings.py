@@ -0,0 +1,136 @@
+"""Lightweight per-phase startup timings.
+
+Enabled with --timings or the BROWSERSELECTOR_TIMINGS environment
+variable ('1' for the default file, '0' for off like
+BROWSERSELECTOR_METRICS, anything else is used as the path).
+Each run appends one JSON record with monotonic phase durations (ms) and
+markers such as cache hits to the timings file. When disabled, phase()
+returns a shared no-op context manager and mark() returns immediately.
+"""
+
+import os
+import time
+
+ENV_VAR = 'BROWSERSELECTOR_TIMINGS'
+DEFAULT_FILE = os.path.join(os.path.expanduser('~'), '.cache', 'browserselector', 'timings.jsonl')
+
+_T0 = time.monotonic()
+
+enabled = False
+_path = None
+_phases = {}
+_marks = {}
+
+
+class _NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, *_exc):
+        elapsed = time.monotonic() - self.start
+        _phases[self.name] = _phases.get(self.name, 0.0) + elapsed * 1000
+        return False
+
+
+def phase(name):
+    """Context manager timing one phase; repeated phases accumulate."""
+    if not enabled:
+        return _NULL_PHASE
+    return _Phase(name)
+
+
+def mark(key, value=True):
+    """Record a marker (e.g. cache hit/miss) in this run's record."""
+    if enabled:
+        _marks[key] = value
+
+
+def since_start(name):
+    """Record the time from process start (this module's import) as a phase."""
+    if enabled:
+        _phases[name] = (time.monotonic() - _T0) * 1000
+
+
+def elapsed():
+    """Seconds since this module's import, whether or not timings are enabled."""
+    return time.monotonic() - _T0
+
+
+def since_exec():
+    """Seconds since the process was started (exec()), including interpreter
+    start-up; elapsed() where /proc is not available.
+
+    Process start times are kept in clock ticks, so this is only accurate
+    to about 10 ms.
+    """
+    try:
+        with open('/proc/self/stat', encoding='ascii') as f:
+            fields = f.read().rpartition(')')[2].split()
+        started = int(fields[19]) / os.sysconf('SC_CLK_TCK')
+        return max(elapsed(), time.clock_gettime(time.CLOCK_BOOTTIME) - started)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return elapsed()
+
+
+def _python_startup_ms():
+    """Time from exec() to this module's import (Linux only), or None."""
+    if not os.path.exists('/proc/self/stat'):
+        return None
+    return (since_exec() - elapsed()) * 1000
+
+
+def enable(path=None):
+    """Turn timings on for this run; the record is written at exit."""
+    global enabled, _path
+    if enabled:
+        return
+    import atexit
+    enabled = True
+    # Absolute, so a relative path works and survives a later chdir
+    _path = os.path.abspath(path or DEFAULT_FILE)
+    startup = _python_startup_ms()
+    if startup is not None:
+        _phases['python_startup'] = startup
+    atexit.register(write)
+
+
+def write():
+    """Append this run's record to the timings file (once per run)."""
+    global _path
+    if not enabled or not _path:
+        return
+    import json
+    record = {
+        "time": time.time(),
+        "pid": os.getpid(),
+        "total_ms": (time.monotonic() - _T0) * 1000,
+        "phases": {k: round(v, 3) for k, v in _phases.items()},
+        "marks": _marks,
+    }
+    path, _path = _path, None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+    except OSError:
+        pass
+
+
+_env = os.environ.get(ENV_VAR)
+if _env and _env != '0':
+    enable(None if _env == '1' else _env)
@@ -0,0 +1,207 @@
+"""inotify-driven change notifications for browsers and config (via Gio.FileMonitor).
+
+A ChangeWatcher monitors the application directories from browser_scan
+and CONFIG_DIR; for application directories that do not exist yet, it
+monitors their nearest existing parent and starts watching them once
+they are created. Bursts of events are debounced; afterwards only the
+.desktop files that changed are parsed again, and subscribers are called
+with (kind, data):
+
+    ('browsers', browser_list)   installed browsers changed
+    ('config', None)             config.json or a system config/policy layer changed
+    ('remembered', None)         remembered sites changed
+"""
+
+import os
+
+import gi
+gi.require_version('Gio', '2.0')
+from gi.repository import Gio, GLib
+
+import browser_scan
+import config
+
+DEBOUNCE_MS = 250
+
+_RELEVANT_EVENTS = {
+    Gio.FileMonitorEvent.CHANGES_DONE_HINT,
+    Gio.FileMonitorEvent.CREATED,
+    Gio.FileMonitorEvent.DELETED,
+    Gio.FileMonitorEvent.MOVED_IN,
+    Gio.FileMonitorEvent.MOVED_OUT,
+    Gio.FileMonitorEvent.RENAMED,
+    Gio.FileMonitorEvent.ATTRIBUTE_CHANGED,
+}
+
+
+class ChangeWatcher:
+    """Watches browser .desktop files and the config directory."""
+
+    def __init__(self, debounce_ms=DEBOUNCE_MS):
+        self.debounce_ms = debounce_ms
+        self._subscribers = []
+        self._monitors = {}
+        self._parent_monitors = {}  # existing parent -> monitor, for missing locations
+        self._missing = set()  # application locations that do not exist yet
+        self._entries = {}  # dir -> {file_path: entry or None}, dirs in priority order
+        self._pending_files = set()
+        self._pending_kinds = set()
+        self._dirs_changed = False
+        self._timeout = 0
+
+        self._watch(config.CONFIG_DIR, self._on_config_event)
+        for config_dir in config.system_config_dirs():
+            self._watch(config_dir, self._on_config_event)
+        self._sync_dirs()
+
+    def subscribe(self, callback):
+        """Register callback(kind, data); returns a function that unsubscribes."""
+        self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+
+    def browsers(self):
+        """Current browser list, kept up to date incrementally."""
+        return browser_scan.browsers_from_entries(
+            [files[path] for path in sorted(files) if files[path] is not None]
+            for files in self._entries.values()
+        )
+
+    def close(self):
+        for monitor in list(self._monitors.values()) + list(self._parent_monitors.values()):
+            monitor.cancel()
+        self._monitors.clear()
+        self._parent_monitors.clear()
+        if self._timeout:
+            GLib.source_remove(self._timeout)
+            self._timeout = 0
+
+    def _watch(self, path, handler, monitors=None):
+        monitors = self._monitors if monitors is None else monitors
+        if path in monitors:
+            return
+        try:
+            monitor = Gio.File.new_for_path(path).monitor_directory(
+                Gio.FileMonitorFlags.WATCH_MOVES, None)
+        except GLib.Error:
+            return
+        monitor.connect('changed', handler)
+        monitors[path] = monitor
+
+    def _sync_dirs(self):
+        """Pick up added/removed application dirs.
+
+        Entries of new dirs come from browser_scan's per-directory cache,
+        so only directories that changed since the last scan are parsed.
+        """
+        missing = set()
+        for location in browser_scan._application_locations():
+            if os.path.isdir(location):
+                if location == browser_scan.FLATPAK_APP_ROOT:
+                    self._watch(location, self._on_flatpak_root_event)
+            else:
+                missing.add(location)
+        self._watch_parents(missing)
+
+        scanned = None
+        entries = {}
+        for dir_path in browser_scan.application_dirs():
+            if dir_path in self._entries:
+                entries[dir_path] = self._entries[dir_path]
+                continue
+            if scanned is None:
+                scanned = browser_scan.scan_directories()
+            entries[dir_path] = {e[1]: e for e in scanned.get(dir_path, [])}
+            self._watch(dir_path, self._on_app_dir_event)
+        for dir_path in set(self._entries) - set(entries):
+            monitor = self._monitors.pop(dir_path, None)
+            if monitor is not None:
+                monitor.cancel()
+        self._entries = entries
+
+    def _watch_parents(self, missing):
+        """Watch the nearest existing parent of each missing location."""
+        parents = set()
+        for location in missing:
+            parent = os.path.dirname(location)
+            while parent != os.path.dirname(parent) and not os.path.isdir(parent):
+                parent = os.path.dirname(parent)
+            parents.add(parent)
+        for parent in set(self._parent_monitors) - parents:
+            self._parent_monitors.pop(parent).cancel()
+        for parent in parents:
+            self._watch(parent, self._on_parent_event, self._parent_monitors)
+        self._missing = missing
+
+    def _on_parent_event(self, _monitor, file, other_file, event_type):
+        if event_type not in _RELEVANT_EVENTS:
+            return
+        for f in (file, other_file):
+            path = f.get_path() if f is not None else None
+            # Only directories on the way to a missing location matter
+            if path and any(loc == path or loc.startswith(path + os.sep) for loc in self._missing):
+                self._dirs_changed = True
+                self._schedule()
+                return
+
+    def _on_app_dir_event(self, _monitor, file, other_file, event_type):
+        if event_type not in _RELEVANT_EVENTS:
+            return
+        for f in (file, other_file):
+            path = f.get_path() if f is not None else None
+            if path and path.endswith('.desktop'):
+                self._pending_files.add(path)
+                self._schedule()
+
+    def _on_flatpak_root_event(self, _monitor, _file, _other_file, event_type):
+        if event_type in _RELEVANT_EVENTS:
+            self._dirs_changed = True
+            self._schedule()
+
+    def _on_config_event(self, _monitor, file, other_file, event_type):
+        if event_type not in _RELEVANT_EVENTS:
+            return
+        for f in (file, other_file):
+            path = f.get_path() if f is not None else None
+            if path == config.CONFIG_FILE or (
+                    path and os.path.dirname(path) != config.CONFIG_DIR
+                    and os.path.basename(path) in ('config.json', 'policy.json')):
+                self._pending_kinds.add('config')
+            elif path and path.startswith(config.REMEMBERED_DB):
+                self._pending_kinds.add('remembered')
+        if self._pending_kinds:
+            self._schedule()
+
+    def _schedule(self):
+        if self._timeout:
+            GLib.source_remove(self._timeout)
+        self._timeout = GLib.timeout_add(self.debounce_ms, self._flush)
+
+    def _flush(self):
+        self._timeout = 0
+        browsers_changed = False
+
+        if self._dirs_changed:
+            self._dirs_changed = False
+            self._sync_dirs()
+            browsers_changed = True
+
+        pending, self._pending_files = self._pending_files, set()
+        for path in pending:
+            files = self._entries.get(os.path.dirname(path))
+            if files is None:
+                continue
+            entry = browser_scan.read_browser_file(path) if os.path.exists(path) else None
+            if files.get(path) != entry or path not in files:
+                files[path] = entry
+                browsers_changed = True
+
+        kinds, self._pending_kinds = self._pending_kinds, set()
+        if browsers_changed:
+            self._emit('browsers', self.browsers())
+        for kind in sorted(kinds):
+            self._emit(kind, None)
+        return GLib.SOURCE_REMOVE
+
+    def _emit(self, kind, data):
+        for callback in list(self._subscribers):
+            callback(kind, data)
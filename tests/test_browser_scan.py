@@ -0,0 +1,58 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'source', 'python'))
+
+import browser_scan  # noqa: E402
+import metrics  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'desktop')
+
+
+class ScanDirectoriesTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.dirs = [os.path.join(self.root, name) for name in ('local', 'system')]
+        for dir_path in self.dirs:
+            os.makedirs(dir_path)
+        shutil.copy(os.path.join(FIXTURES, 'firefox.desktop'), self.dirs[0])
+        shutil.copy(os.path.join(FIXTURES, 'localized-lang.desktop'), self.dirs[1])
+        self.saved = {name: getattr(browser_scan, name) for name in
+                      ('CACHE_DIR', 'CACHE_FILE', '_application_locations', '_parse_files')}
+        self.saved_metrics = metrics.enabled
+        metrics.enabled = False
+        browser_scan.CACHE_DIR = os.path.join(self.root, 'cache')
+        browser_scan.CACHE_FILE = os.path.join(self.root, 'cache', 'browsers.json')
+        browser_scan._application_locations = lambda: list(self.dirs)
+        self.parsed = []
+
+        def parse_files(paths, workers=None):
+            self.parsed.extend(paths)
+            return self.saved['_parse_files'](paths, workers)
+        browser_scan._parse_files = parse_files
+
+    def tearDown(self):
+        for name, value in self.saved.items():
+            setattr(browser_scan, name, value)
+        metrics.enabled = self.saved_metrics
+        shutil.rmtree(self.root)
+
+    def test_cached_directories_are_not_parsed_again(self):
+        first = browser_scan.scan_directories()
+        self.assertEqual(list(first), self.dirs)
+        self.assertEqual(len(self.parsed), 2)
+        self.parsed.clear()
+        shutil.copy(os.path.join(FIXTURES, 'no-icon.desktop'), self.dirs[1])
+        second = browser_scan.scan_directories()
+        self.assertEqual(self.parsed, sorted(os.path.join(self.dirs[1], name) for name in
+                                             ('localized-lang.desktop', 'no-icon.desktop')))
+        self.assertEqual(second[self.dirs[0]], first[self.dirs[0]])
+        self.assertEqual([e[0] for e in second[self.dirs[1]]], ['Chromium', 'Iconless'])
+        self.assertEqual(second, browser_scan.scan_directories(use_cache=False))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'source', 'python'))
+
+import config  # noqa: E402
+import routing  # noqa: E402
+import store  # noqa: E402
+
+
+class _FlakyStore(store.RememberedStore):
+    """A RememberedStore whose first `failures` transactions fail as if locked."""
+
+    failures = 0
+
+    def transaction(self):
+        if _FlakyStore.failures:
+            _FlakyStore.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        return super().transaction()
+
+
+class WriteBehindTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.saved = {name: getattr(config, name) for name in
+                      ('REMEMBERED_DB', 'REMEMBERED_FILE', 'WRITE_RETRY_DELAY', '_store')}
+        config.REMEMBERED_DB = os.path.join(self.dir.name, 'remembered.db')
+        config.REMEMBERED_FILE = os.path.join(self.dir.name, 'remembered.json')
+        config.WRITE_RETRY_DELAY = 0.001
+        config._store = None
+        self.original_store = store.RememberedStore
+        store.RememberedStore = _FlakyStore
+
+    def tearDown(self):
+        store.RememberedStore = self.original_store
+        _FlakyStore.failures = 0
+        if config._store is not None:
+            config._store.close()
+        for name, value in self.saved.items():
+            setattr(config, name, value)
+        self.dir.cleanup()
+
+    def test_update_survives_a_failed_write(self):
+        _FlakyStore.failures = 1
+        config.remember_later("example.com", "Firefox")
+        self.assertTrue(config.flush_remembered())
+        self.assertEqual(config.load_remembered(), {"example.com": "Firefox"})
+
+    def test_flush_writes_what_the_writer_gave_up_on(self):
+        _FlakyStore.failures = config.WRITE_RETRIES + 1
+        config.remember_later("example.com", "Firefox")
+        self.assertTrue(config.flush_remembered())
+        self.assertEqual(_FlakyStore.failures, 0)
+        self.assertEqual(config.load_remembered(), {"example.com": "Firefox"})
+
+
+LEGACY_RULES = {"GitHub.com": "Firefox", "www.Example.org:443": "Chromium", " ": "Firefox"}
+IMPORTED_RULES = {"github.com": "Firefox", "www.example.org": "Chromium"}
+
+
+class LegacyImportTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.dir.name, 'remembered.db')
+        self.legacy = os.path.join(self.dir.name, 'remembered.json')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_unreadable_legacy_file_is_imported_on_the_next_open(self):
+        os.mkdir(self.legacy)  # reading it raises an OSError other than FileNotFoundError
+        first = store.RememberedStore(self.db, legacy_json=self.legacy)
+        self.assertEqual(first.items(), {})
+        first.close()
+        os.rmdir(self.legacy)
+        with open(self.legacy, 'w', encoding='utf-8') as f:
+            json.dump(LEGACY_RULES, f)
+        second = store.RememberedStore(self.db, legacy_json=self.legacy)
+        self.assertEqual(second.items(), IMPORTED_RULES)
+        self.assertEqual(routing.match_rule("github.com", second), ("github.com", "Firefox"))
+        second.close()
+
+    def test_legacy_keys_are_normalized(self):
+        with open(self.legacy, 'w', encoding='utf-8') as f:
+            json.dump(LEGACY_RULES, f)
+        opened = store.RememberedStore(self.db, legacy_json=self.legacy)
+        self.assertEqual(opened.items(), IMPORTED_RULES)
+        opened.close()
+
+    def test_missing_legacy_file_counts_as_imported(self):
+        store.RememberedStore(self.db, legacy_json=self.legacy).close()
+        with open(self.legacy, 'w', encoding='utf-8') as f:
+            json.dump({"example.com": "Firefox"}, f)
+        reopened = store.RememberedStore(self.db, legacy_json=self.legacy)
+        self.assertEqual(reopened.items(), {})
+        reopened.close()
+
+
+class LayeredPolicyTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        root = self.dir.name
+        self.saved = {name: getattr(config, name) for name in ('CONFIG_FILE', 'POLICY_CACHE', '_policy')}
+        self.saved_dirs = os.environ.get('XDG_CONFIG_DIRS')
+        os.environ['XDG_CONFIG_DIRS'] = f"{root}/high:{root}/low"
+        config.CONFIG_FILE = os.path.join(root, 'user', 'config.json')
+        config.POLICY_CACHE = os.path.join(root, 'cache', 'policy.json')
+        config._policy = None
+        self.write('low/browserselector/config.json',
+                   {"appearance": {"icon_size": 32, "grid_columns": 3}, "default_browser": "Chromium"})
+        self.write('low/browserselector/policy.json',
+                   {"forced_rules": {"*.Example.com": "Chromium", "A.test": "Chromium"},
+                    "allowed_browsers": ["Firefox", "Chromium", "Epiphany"]})
+        self.write('high/browserselector/config.json', {"appearance": {"icon_size": 40}})
+        self.write('high/browserselector/policy.json',
+                   {"forced_rules": {"*.example.com": "Firefox"}, "allowed_browsers": ["Firefox", "Chromium"]})
+        self.write('user/config.json', {"appearance": {"grid_columns": 4}, "default_browser": "Firefox"})
+
+    def tearDown(self):
+        for name, value in self.saved.items():
+            setattr(config, name, value)
+        if self.saved_dirs is None:
+            del os.environ['XDG_CONFIG_DIRS']
+        else:
+            os.environ['XDG_CONFIG_DIRS'] = self.saved_dirs
+        self.dir.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.dir.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+    def test_layers_merge_in_precedence_order(self):
+        self.assertEqual(config.load_config(), {
+            "appearance": {"icon_size": 40, "grid_columns": 4, "border_radius": 12},
+            "default_browser": "Firefox",
+        })
+        self.assertEqual(config.forced_rules(), {"*.example.com": "Firefox", "a.test": "Chromium"})
+        browsers = [{"name": name} for name in ("Firefox", "Chromium", "Epiphany")]
+        self.assertEqual(config.filter_browsers(browsers), browsers[:2])
+
+    def test_user_config_cannot_override_policy(self):
+        self.write('user/config.json', {"forced_rules": {"*.example.com": "Epiphany"},
+                                        "allowed_browsers": ["Epiphany"]})
+        self.assertEqual(config.forced_rules()["*.example.com"], "Firefox")
+        self.assertEqual(config.load_policy()["allowed_browsers"], ["Firefox", "Chromium"])
+
+    def test_editing_a_layer_invalidates_the_cache(self):
+        self.assertEqual(config.forced_rules()["*.example.com"], "Firefox")
+        config._policy = None
+        with open(config.POLICY_CACHE, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)["forced_rules"]["*.example.com"], "Firefox")
+        self.write('high/browserselector/policy.json', {"forced_rules": {"*.example.com": "Epiphany"}})
+        self.assertEqual(config.forced_rules()["*.example.com"], "Epiphany")
+        self.assertEqual(config.load_policy()["allowed_browsers"], ["Firefox", "Chromium", "Epiphany"])
+        config._policy = None
+        with open(config.POLICY_CACHE, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)["forced_rules"]["*.example.com"], "Epiphany")
+
+
+if __name__ == '__main__':
+    unittest.main()
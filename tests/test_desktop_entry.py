@@ -0,0 +1,90 @@
+"""Compare read_desktop_entry() with the pyxdg-based parser it replaced."""
+
+import glob
+import os
+import shutil
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'source', 'python'))
+
+import browser_scan  # noqa: E402
+
+try:
+    import xdg.Locale
+    from xdg.DesktopEntry import DesktopEntry
+except ImportError:
+    DesktopEntry = None
+
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                         'fixtures', 'desktop', '*.desktop')))
+LOCALES = ('C', 'de_DE.UTF-8', 'de_AT.UTF-8', 'fr_FR')
+BROWSER_CATEGORIES = {'web-browser', 'browser', 'internet', 'web browser', 'webbrowser'}
+
+
+def pyxdg_entry(file_path):
+    """The browser record as the old parse_desktop_entry() built it with pyxdg."""
+    entry = DesktopEntry()
+    entry.parse(file_path)
+    icon = entry.getIcon()
+    if icon and '/' in icon and 'appimage' in file_path.lower():
+        if not os.path.exists(icon):
+            icon = "web-browser"
+    exec_cmd = browser_scan.clean_exec_command(entry.getExec())
+    if not exec_cmd:
+        return entry.getName(), None
+    return entry.getName(), {"name": entry.getName(), "exec_command": exec_cmd, "icon": icon or "web-browser"}
+
+
+def pyxdg_is_browser(file_path):
+    """The old scan's candidate check, plus the Hidden, NoDisplay and TryExec keys."""
+    entry = DesktopEntry()
+    entry.parse(file_path)
+    name = entry.getName()
+    if name and name.lower() in browser_scan.SELF_NAMES:
+        return False
+    categories = {cat.strip().lower() for cat in entry.getCategories()}
+    if not categories & BROWSER_CATEGORIES:
+        return False
+    if entry.getHidden() or entry.getNoDisplay():
+        return False
+    try_exec = entry.getTryExec()
+    if try_exec:
+        found = os.access(try_exec, os.X_OK) if os.path.isabs(try_exec) else shutil.which(try_exec)
+        if not found:
+            return False
+    return True
+
+
+@unittest.skipIf(DesktopEntry is None, "pyxdg is not installed")
+class PyxdgEquivalenceTest(unittest.TestCase):
+    def test_fixtures_present(self):
+        self.assertGreaterEqual(len(FIXTURES), 10)
+
+    def test_records_match_field_by_field(self):
+        for locale in LOCALES:
+            with mock.patch.dict(os.environ, {'LANGUAGE': locale}):
+                xdg.Locale.update(locale)
+                langs = browser_scan._locale_candidates()
+                for path in FIXTURES:
+                    with self.subTest(locale=locale, fixture=os.path.basename(path)):
+                        expected_name, expected = pyxdg_entry(path)
+                        name, info = browser_scan.read_desktop_entry(path, langs=langs)
+                        self.assertEqual(name, expected_name)
+                        if expected is None:
+                            self.assertIsNone(info)
+                            continue
+                        for field in ("name", "exec_command", "icon"):
+                            self.assertEqual(info[field], expected[field], field)
+        xdg.Locale.update()
+
+    def test_browser_candidates_match(self):
+        for path in FIXTURES:
+            with self.subTest(fixture=os.path.basename(path)):
+                found = browser_scan.read_desktop_entry(path, browsers_only=True, langs=[])
+                self.assertEqual(found is not None, pyxdg_is_browser(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'source', 'python'))
+
+import browser_scan  # noqa: E402
+import launcher  # noqa: E402
+import metrics  # noqa: E402
+from launcher import expand_exec  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'desktop')
+
+
+def _browser(fixture):
+    return browser_scan.read_desktop_entry(os.path.join(FIXTURES, fixture), langs=[])[1]
+
+
+class ExpandExecTest(unittest.TestCase):
+    def test_icon_code_without_icon_key_expands_to_nothing(self):
+        browser = _browser('no-icon.desktop')
+        self.assertEqual(browser["icon"], "web-browser")
+        self.assertEqual(expand_exec(browser, ["https://example.com/"]),
+                         [["iconless", "--url", "https://example.com/", "Iconless"]])
+
+    def test_icon_code_with_icon_key(self):
+        browser = dict(_browser('no-icon.desktop'), icon_key="iconless")
+        self.assertEqual(expand_exec(browser, ["https://example.com/"]),
+                         [["iconless", "--url", "https://example.com/", "--icon", "iconless", "Iconless"]])
+
+    def test_one_command_for_all_urls(self):
+        browser = _browser('localized-lang.desktop')
+        self.assertEqual(expand_exec(browser, ["https://a.test/", "https://b.test/"]),
+                         [["chromium", "https://a.test/", "https://b.test/"]])
+
+    def test_urls_in_quoted_arguments_are_shell_quoted(self):
+        browser = _browser('tryexec-ok.desktop')
+        self.assertEqual(browser["argv_quoted"], [2])
+        self.assertEqual(expand_exec(browser, ["https://a.test/?q='x'"]),
+                         [["sh", "-c", "echo 'https://a.test/?q='\\''x'\\'''"]])
+
+    def test_url_cannot_inject_shell_commands(self):
+        browser = _browser('tryexec-ok.desktop')
+        with tempfile.TemporaryDirectory() as root:
+            marker = os.path.join(root, 'pwned')
+            for url in (f"https://evil.test/$(touch {marker})", f"https://evil.test/';touch {marker};'"):
+                for argv in expand_exec(browser, [url]):
+                    pid = launcher.spawn(argv)
+                    self.assertIsNotNone(pid)
+                    os.waitpid(pid, 0)
+            self.assertFalse(os.path.exists(marker))
+
+
+class LaunchUrlsTest(unittest.TestCase):
+    def setUp(self):
+        self.saved = (metrics.enabled, metrics._pending, metrics._registered)
+        metrics.enabled, metrics._pending, metrics._registered = True, {}, True
+
+    def tearDown(self):
+        metrics.enabled, metrics._pending, metrics._registered = self.saved
+
+    def test_failed_spawns_are_not_counted(self):
+        browser = _browser('firefox.desktop')
+        urls = ["https://a.test/", "https://b.test/"]
+        with mock.patch.object(launcher, 'spawn', return_value=None):
+            self.assertFalse(launcher.launch_urls(browser, urls))
+        self.assertEqual(metrics._pending, {})
+        pids = iter([1, None])
+        with mock.patch.object(launcher, 'spawn', side_effect=lambda argv: next(pids)):
+            self.assertFalse(launcher.launch_urls(browser, urls))
+        self.assertEqual(metrics._pending, {'launches': {'Firefox': 1}, 'urls': {'Firefox': 1}})
+
+    def test_one_command_counts_all_its_urls(self):
+        browser = _browser('localized-lang.desktop')
+        with mock.patch.object(launcher, 'spawn', return_value=1):
+            self.assertTrue(launcher.launch_urls(browser, ["https://a.test/", "https://b.test/"]))
+        self.assertEqual(metrics._pending, {'launches': {'Chromium': 1}, 'urls': {'Chromium': 2}})
+
+
+if __name__ == '__main__':
+    unittest.main()
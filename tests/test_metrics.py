@@ -0,0 +1,44 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'source', 'python'))
+
+import metrics  # noqa: E402
+
+
+def _data():
+    data = metrics._empty()
+    metrics._add(data, {
+        'launches': {'Firefox': 2},
+        'urls': {'Firefox': 3},
+        'latency': {('rule', 0): 1, ('rule', 2): 2, ('rule', len(metrics.LATENCY_BUCKETS)): 1,
+                    ('rule', 'sum'): 7.5},
+    })
+    return data
+
+
+class RenderTest(unittest.TestCase):
+    def test_openmetrics(self):
+        lines = metrics.render(_data()).splitlines()
+        self.assertIn('# TYPE browserselector_launches counter', lines)
+        self.assertIn('browserselector_launches_total{browser="Firefox"} 2', lines)
+        self.assertIn('browserselector_urls_opened_total{browser="Firefox"} 3', lines)
+        self.assertIn('# TYPE browserselector_launch_latency_seconds histogram', lines)
+        buckets = [line.rsplit(' ', 1)[1] for line in lines
+                   if line.startswith('browserselector_launch_latency_seconds_bucket{path="rule"')]
+        self.assertEqual(buckets, ['1', '1', '3', '3', '3', '3', '3', '3', '3', '4'])
+        self.assertIn('browserselector_launch_latency_seconds_bucket{path="rule",le="+Inf"} 4', lines)
+        self.assertIn('browserselector_launch_latency_seconds_count{path="rule"} 4', lines)
+        self.assertIn('browserselector_launch_latency_seconds_sum{path="rule"} 7.500000', lines)
+        self.assertEqual(lines[-1], '# EOF')
+
+    def test_prometheus_text(self):
+        lines = metrics.render(_data(), openmetrics=False).splitlines()
+        self.assertIn('# TYPE browserselector_launches_total counter', lines)
+        self.assertIn('browserselector_launches_total{browser="Firefox"} 2', lines)
+        self.assertNotIn('# EOF', lines)
+
+
+if __name__ == '__main__':
+    unittest.main()
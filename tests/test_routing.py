@@ -0,0 +1,92 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'source', 'python'))
+
+from rules import normalize_rule  # noqa: E402
+from routing import resolve_urls, route_urls, url_domain  # noqa: E402
+from store import RememberedStore  # noqa: E402
+
+BROWSERS = [{"name": name} for name in ("Firefox", "Chromium", "Epiphany")]
+OLD_KEYS = {"GitHub.com": "Firefox", ".Example.org": "Chromium", "bücher.de": "Epiphany"}
+URLS = [
+    "https://github.com/", "https://GITHUB.com:443/x", "http://Example.org/", "https://www.example.org/a",
+    "https://bücher.de/", "https://xn--bcher-kva.de/", "https://www.bücher.de/", "https://other.test/",
+]
+
+
+class ResolveMatchesLaunchTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'remembered.db')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _assert_agree(self, store, forced=None):
+        remembered = store.items()
+        resolved = {url: result["browser"] if result["source"] in ("remembered", "forced") else None
+                    for url, result in resolve_urls(URLS, BROWSERS, remembered, forced=forced)}
+        routes, unresolved = route_urls(URLS, BROWSERS, store, forced)
+        launched = dict.fromkeys(unresolved)
+        for name, (_browser, urls) in routes.items():
+            launched.update(dict.fromkeys(urls, name))
+        self.assertEqual(resolved, launched)
+        self.assertEqual(launched["https://GITHUB.com:443/x"], "Firefox")
+        self.assertEqual(launched["https://www.example.org/a"], "Chromium")
+        self.assertEqual(launched["https://xn--bcher-kva.de/"], "Epiphany")
+        if forced is None:
+            self.assertIsNone(launched["https://www.bücher.de/"])
+        return launched
+
+    def test_keys_stored_by_older_versions(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE remembered (domain TEXT PRIMARY KEY, browser TEXT NOT NULL)")
+        conn.executemany("INSERT INTO remembered VALUES (?, ?)", OLD_KEYS.items())
+        conn.commit()
+        conn.close()
+        store = RememberedStore(self.path)
+        try:
+            self._assert_agree(store)
+        finally:
+            store.close()
+
+    def test_keys_written_through_the_store(self):
+        store = RememberedStore(self.path)
+        try:
+            store.update(OLD_KEYS)
+            self._assert_agree(store)
+        finally:
+            store.close()
+
+    def test_forced_rules_win(self):
+        store = RememberedStore(self.path)
+        try:
+            store.update(OLD_KEYS)
+            forced = {normalize_rule(".other.test"): "Chromium", normalize_rule("WWW.bücher.de"): "Firefox"}
+            launched = self._assert_agree(store, forced)
+            self.assertEqual(launched["https://other.test/"], "Chromium")
+            self.assertEqual(launched["https://www.bücher.de/"], "Firefox")
+        finally:
+            store.close()
+
+
+class MalformedUrlTest(unittest.TestCase):
+    def test_bad_urls_go_to_the_chooser(self):
+        urls = ["https://github.com/ok", "http://[oops/", "https://[::1/x", "not a url"]
+        routes, unresolved = route_urls(urls, BROWSERS, {"github.com": "Firefox"})
+        self.assertEqual(list(routes), ["Firefox"])
+        self.assertEqual(routes["Firefox"][1], ["https://github.com/ok"])
+        self.assertEqual(unresolved, urls[1:])
+        resolved = [result["source"] for _url, result in resolve_urls(urls, BROWSERS, {"github.com": "Firefox"})]
+        self.assertEqual(resolved, ["remembered", "prompt", "prompt", "prompt"])
+
+    def test_url_domain_of_bad_url_is_empty(self):
+        self.assertEqual(url_domain("http://[oops/"), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'source', 'python'))
+
+from rules import match_mapping, normalize_host, normalize_rule  # noqa: E402
+from store import RememberedStore  # noqa: E402
+
+RULES = {
+    "GitHub.com": "Exact",
+    ".Example.org": "Parent",
+    "*.example.org:8080": "Wildcard port",
+    "bücher.de": "IDN",
+    "straße.de": "IDNA2008",
+    "*.corp.example.net": "Wildcard",
+    "localhost:8080": "Port",
+}
+HOSTS = [
+    ("github.com", None, "Exact"), ("GITHUB.COM:443", "https", "Exact"), ("api.github.com", None, None),
+    ("example.org", None, "Parent"), ("a.b.example.org", None, "Parent"),
+    ("a.example.org:8080", "http", "Wildcard port"), ("example.org:8080", "http", "Parent"),
+    ("bücher.de", None, "IDN"), ("xn--bcher-kva.de", None, "IDN"),
+    ("Straße.de", None, "IDNA2008"), ("XN--strae-oqa.de", None, "IDNA2008"), ("strasse.de", None, None),
+    ("corp.example.net", None, None), ("x.corp.example.net", None, "Wildcard"),
+    ("localhost:8080", "http", "Port"), ("localhost", "http", None), ("unknown.test", None, None),
+]
+
+
+class MatchMappingTest(unittest.TestCase):
+    def test_most_specific_rule_wins(self):
+        mapping = {normalize_rule(key): value for key, value in RULES.items()}
+        for netloc, scheme, expected in HOSTS:
+            host_key = normalize_host(netloc, scheme)
+            match = match_mapping(mapping, host_key)
+            self.assertEqual(match[1] if match else None, expected, host_key)
+
+    def test_idna2008_without_the_idna_package(self):
+        with mock.patch.dict(sys.modules, {'idna': None}):
+            self.assertEqual(normalize_host("Straße.de"), "xn--strae-oqa.de")
+            self.assertEqual(normalize_host("bücher.xn--strae-oqa.de"), "xn--bcher-kva.xn--strae-oqa.de")
+            self.assertEqual(normalize_rule("*.XN--Strae-OQA.de"), "*.xn--strae-oqa.de")
+
+    def test_store_normalizes_old_keys(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'remembered.db')
+            conn = sqlite3.connect(path)
+            conn.execute("CREATE TABLE remembered (domain TEXT PRIMARY KEY, browser TEXT NOT NULL)")
+            conn.executemany("INSERT INTO remembered VALUES (?, ?)",
+                             list(RULES.items()) + [("github.com", "Normal")])
+            conn.commit()
+            conn.close()
+            store = RememberedStore(path)
+            try:
+                self.assertEqual(store.items(), dict(
+                    {normalize_rule(key): value for key, value in RULES.items()},
+                    **{"github.com": "Normal"}))
+                store.put("Example.COM", "Put")
+                self.assertEqual(store.get("example.com"), "Put")
+            finally:
+                store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'source', 'python'))
+
+import main  # noqa: E402
+import rules_io  # noqa: E402
+from store import MERGE_STRATEGIES, RememberedStore  # noqa: E402
+
+
+class ImportRulesTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.store = RememberedStore(os.path.join(self.dir.name, 'remembered.db'))
+        self.store.update({"example.com": "Firefox", "example.org": "Chromium"})
+
+    def tearDown(self):
+        self.store.close()
+        self.dir.cleanup()
+
+    def _import(self, content, strategy='replace', name='rules.csv'):
+        path = os.path.join(self.dir.name, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return rules_io.import_rules(self.store, path, strategy)
+
+    def test_replace(self):
+        counts = self._import(b'domain,browser\nGitHub.com,Firefox\n')
+        self.assertEqual(counts["removed"], 2)
+        self.assertEqual(self.store.items(), {"github.com": "Firefox"})
+
+    def test_invalid_rows_leave_store_unchanged(self):
+        for content in (b'domain,browser\njunk\n', b'domain,browser\na.com,Firefox\njunk\n', b''):
+            with self.assertRaises(ValueError):
+                self._import(content)
+            self.assertEqual(len(self.store), 2)
+
+    def test_undecodable_file_leaves_store_unchanged(self):
+        with self.assertRaises(ValueError):
+            self._import(b'domain,browser\nb\xfccher.de,Firefox\n')
+        self.assertEqual(len(self.store), 2)
+
+
+class CommandLineTest(unittest.TestCase):
+    def test_choices_match_the_modules(self):
+        # main.py spells these out to keep rules_io off the start-up path
+        self.assertEqual(main.MERGE_STRATEGIES, MERGE_STRATEGIES)
+        self.assertEqual(main.RULE_FORMATS, rules_io.FORMATS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import sys
+import types
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'source', 'python'))
+
+
+def _fake_gi():
+    """Just enough of gi for selector.py to import without GTK."""
+    gi = types.ModuleType('gi')
+    gi.require_version = lambda namespace, version: None
+    repository = types.ModuleType('gi.repository')
+    repository.Gtk = types.SimpleNamespace(ApplicationWindow=object, Application=object)
+    repository.GLib = types.SimpleNamespace(SOURCE_REMOVE=False, SOURCE_CONTINUE=True)
+    repository.Gdk = repository.Gio = repository.GdkPixbuf = types.SimpleNamespace()
+    gi.repository = repository
+    return {'gi': gi, 'gi.repository': repository}
+
+
+class _SelectorTestCase(unittest.TestCase):
+    def setUp(self):
+        modules = mock.patch.dict(sys.modules, _fake_gi())
+        modules.start()
+        self.addCleanup(modules.stop)
+        sys.modules.pop('selector', None)
+        sys.modules.pop('icon_cache', None)
+        import selector
+        self.selector = selector
+
+
+class IconsLoadedTest(_SelectorTestCase):
+    def test_missing_texture_falls_back_to_theme_name_or_file(self):
+        browsers = [{"name": "Firefox", "icon": "firefox"},
+                    {"name": "AppImage", "icon": "/opt/app/icon.png"},
+                    {"name": "Cached", "icon": "cached"}]
+        window = types.SimpleNamespace(_destroyed=False, browser_list=browsers,
+                                       _icons={b["name"]: mock.Mock() for b in browsers})
+        texture = object()
+        self.selector.SelectorWindow._on_icons_loaded(window, {"Cached": texture})
+        window._icons["Firefox"].set_from_icon_name.assert_called_once_with("firefox")
+        window._icons["AppImage"].set_from_file.assert_called_once_with("/opt/app/icon.png")
+        window._icons["Cached"].set_from_paintable.assert_called_once_with(texture)
+        window._icons["Firefox"].set_from_file.assert_not_called()
+
+
+class CommandLineTest(_SelectorTestCase):
+    def command_line(self, *args):
+        app = mock.Mock(daemon=True)
+        line = mock.Mock(get_arguments=mock.Mock(return_value=['browserselector', *args]))
+        self.selector.SelectorApplication.do_command_line(app, line)
+        return app
+
+    def test_plain_call_shows_an_empty_chooser(self):
+        self.command_line().show_urls.assert_called_once_with([])
+
+    def test_daemon_start_and_reload_stay_hidden(self):
+        self.command_line('--daemon').show_urls.assert_not_called()
+        app = self.command_line('--reload')
+        app.refresh.assert_called_once_with(rescan=True)
+        app.show_urls.assert_not_called()
+        self.command_line('--reload', 'https://example.com/').show_urls.assert_called_once_with(
+            ['https://example.com/'])
+
+
+class IdleTimeoutTest(_SelectorTestCase):
+    def idle_timeout(self, *visible):
+        app = mock.Mock(get_windows=mock.Mock(return_value=[mock.Mock(get_visible=mock.Mock(return_value=v))
+                                                            for v in visible]))
+        self.selector.SelectorApplication._on_idle_timeout(app)
+        return app
+
+    def test_open_settings_window_keeps_the_daemon(self):
+        self.idle_timeout(False, True).quit.assert_not_called()
+
+    def test_quits_when_all_windows_are_hidden(self):
+        self.idle_timeout(False).quit.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'source', 'python'))
+
+from site_index import SiteIndex  # noqa: E402
+
+SITES = {
+    "example.com": "Firefox",
+    "mail.example.com": "Chromium",
+    "*.docs.example.com": "Firefox",
+    "notexample.com": "Chromium",
+    "example.com.evil.test": "Firefox",
+    "localhost:8080": "Epiphany",
+}
+
+
+class SiteIndexTest(unittest.TestCase):
+    def assertConsistent(self, index):
+        rebuilt = SiteIndex(index._browsers)
+        self.assertEqual(index._reversed, rebuilt._reversed)
+        self.assertEqual(index._by_browser, rebuilt._by_browser)
+
+    def test_suffix_matches_whole_labels_only(self):
+        index = SiteIndex(SITES)
+        expected = ["example.com", "mail.example.com", "*.docs.example.com"]
+        self.assertEqual(index.search(".example.com"), expected)
+        self.assertEqual(index.search("*.Example.COM"), expected)
+        self.assertEqual(index.search(".localhost"), ["localhost:8080"])
+
+    def test_search_by_domain_or_browser_name(self):
+        index = SiteIndex(SITES)
+        self.assertIsNone(index.search("  "))
+        self.assertEqual(index.search("chrom"), ["mail.example.com", "notexample.com"])
+        self.assertEqual(index.search("epiphany"), ["localhost:8080"])
+        self.assertEqual(index.search("evil"), ["example.com.evil.test"])
+
+    def test_add_reassigns_and_remove_drops_entries(self):
+        index = SiteIndex(SITES)
+        index.add("mail.example.com", "Firefox")
+        self.assertEqual(index.search("chromium"), ["notexample.com"])
+        self.assertIn("mail.example.com", index.search("firefox"))
+        index.add("new.example.com", "Chromium")
+        index.remove("notexample.com")
+        index.remove("missing.test")
+        self.assertEqual(len(index), len(SITES))
+        self.assertEqual(index.search("chromium"), ["new.example.com"])
+        self.assertEqual(index.search(".example.com"),
+                         ["example.com", "mail.example.com", "*.docs.example.com", "new.example.com"])
+        self.assertConsistent(index)
+        index.remove("localhost:8080")
+        self.assertNotIn("epiphany", index._by_browser)
+        self.assertConsistent(index)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'source', 'python')
+sys.path.insert(0, SOURCE)
+
+import timings  # noqa: E402
+
+
+class TimingsTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'timings.jsonl')
+        self.saved = (timings.enabled, timings._path, dict(timings._phases), dict(timings._marks))
+        timings.enabled, timings._path = False, None
+        timings._phases.clear()
+        timings._marks.clear()
+
+    def tearDown(self):
+        timings.enabled, timings._path, phases, marks = self.saved
+        timings._phases.clear()
+        timings._phases.update(phases)
+        timings._marks.clear()
+        timings._marks.update(marks)
+        self.dir.cleanup()
+
+    def test_disabled_records_nothing(self):
+        with timings.phase('scan'):
+            pass
+        timings.mark('cache', 'hit')
+        timings.since_start('ready')
+        timings.write()
+        self.assertEqual((timings._phases, timings._marks), ({}, {}))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_enabled_appends_one_record(self):
+        timings.enable(self.path)
+        with timings.phase('scan'):
+            pass
+        with timings.phase('scan'):
+            pass
+        timings.mark('cache', 'hit')
+        timings.write()
+        timings.write()
+        with open(self.path, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 1)
+        self.assertIn('scan', records[0]["phases"])
+        self.assertEqual(records[0]["marks"], {"cache": "hit"})
+
+    def test_environment_variable(self):
+        for value, expected in (('0', 'False None'), (self.path, f'True {self.path}')):
+            env = dict(os.environ, **{timings.ENV_VAR: value})
+            out = subprocess.run([sys.executable, '-c', 'import timings; print(timings.enabled, timings._path)'],
+                                 cwd=self.dir.name, env=dict(env, PYTHONPATH=SOURCE),
+                                 capture_output=True, text=True, check=True).stdout
+            self.assertEqual(out.strip(), expected)
+        self.assertFalse(os.path.exists(os.path.join(self.dir.name, '0')))
+
+
+if __name__ == '__main__':
+    unittest.main()